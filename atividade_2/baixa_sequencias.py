@@ -0,0 +1,188 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from photos_extract import clean_extracted, get_photo_array_positions
+
+# Endereço da resposta com os detalhes (e as fotos) de uma sequência
+# do KartaView, no mesmo formato de 'sample1.json'.
+URL_DETALHES = "https://api.openstreetcam.org/details?id={sequencia}"
+
+DIRETORIO_CACHE = ".cache_kartaview"
+
+# 429 (limite de requisições) é temporário como os erros 5xx.
+CODIGO_MUITAS_REQUISICOES = 429
+
+
+def _sha256(dados):
+    return hashlib.sha256(dados).hexdigest()
+
+
+class CacheRespostas:
+    """
+    Cache em disco das respostas baixadas, endereçado pelo conteúdo.
+
+    Cada resposta é guardada uma única vez em 'objetos/<sha256 do conteúdo>'
+    e o arquivo 'urls/<sha256 da url>' contém apenas o hash do conteúdo
+    daquela url. Respostas iguais de urls diferentes (e.g. páginas vazias)
+    ocupam assim um só arquivo.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_CACHE):
+        self.diretorio = diretorio
+        os.makedirs(os.path.join(diretorio, "objetos"), exist_ok=True)
+        os.makedirs(os.path.join(diretorio, "urls"), exist_ok=True)
+
+    def _caminho_url(self, url):
+        return os.path.join(self.diretorio, "urls", _sha256(url.encode()))
+
+    def _caminho_objeto(self, digest):
+        return os.path.join(self.diretorio, "objetos", digest)
+
+    def get(self, url):
+        """Retorna o conteúdo (bytes) guardado para 'url' ou None."""
+        try:
+            with open(self._caminho_url(url), "r") as f:
+                digest = f.read().strip()
+            with open(self._caminho_objeto(digest), "rb") as f:
+                dados = f.read()
+        except FileNotFoundError:
+            return None
+        if _sha256(dados) != digest:
+            # Objeto corrompido (e.g. escrita interrompida): baixa de novo.
+            return None
+        return dados
+
+    def put(self, url, dados):
+        """Guarda o conteúdo 'dados' (bytes) da 'url'."""
+        digest = _sha256(dados)
+        caminho = self._caminho_objeto(digest)
+        if not os.path.exists(caminho):
+            _escreve_atomico(caminho, dados)
+        _escreve_atomico(self._caminho_url(url), digest.encode())
+        return digest
+
+
+def _escreve_atomico(caminho, dados):
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "wb") as f:
+        f.write(dados)
+    os.replace(temporario, caminho)
+
+
+def _baixa(url, timeout):
+    with urllib.request.urlopen(url, timeout=timeout) as resposta:
+        return resposta.read()
+
+
+async def baixa_url(url, executor, cache=None, tentativas=3, espera=1.0, timeout=30):
+    """
+    Baixa 'url' (consultando antes o 'cache') e retorna o conteúdo em bytes.
+
+    Em caso de erro de rede ou de resposta 5xx ou 429, tenta de novo
+    até 'tentativas' vezes, dobrando o tempo de 'espera' entre elas (ou
+    esperando o indicado no cabeçalho Retry-After, se for maior). Os
+    demais erros 4xx não são repetidos.
+    """
+    if tentativas < 1:
+        raise ValueError(f"'tentativas' deve ser pelo menos 1, não {tentativas!r}.")
+    if cache is not None:
+        dados = cache.get(url)
+        if dados is not None:
+            return dados
+
+    loop = asyncio.get_running_loop()
+    for tentativa in range(tentativas):
+        intervalo = espera * 2 ** tentativa
+        try:
+            dados = await loop.run_in_executor(executor, _baixa, url, timeout)
+            break
+        except urllib.error.HTTPError as e:
+            temporario = e.code >= 500 or e.code == CODIGO_MUITAS_REQUISICOES
+            if not temporario or tentativa == tentativas - 1:
+                raise
+            retry_after = e.headers.get("Retry-After", "") if e.headers else ""
+            if retry_after.isdigit():
+                intervalo = max(intervalo, int(retry_after))
+        except (urllib.error.URLError, OSError):
+            if tentativa == tentativas - 1:
+                raise
+        await asyncio.sleep(intervalo)
+
+    if cache is not None:
+        cache.put(url, dados)
+    return dados
+
+
+async def baixa_urls(urls, conexoes=8, cache=None, **kwargs):
+    """
+    Baixa todas as 'urls' concorrentemente, com no máximo 'conexoes'
+    downloads simultâneos, e retorna a lista de conteúdos (bytes) na
+    mesma ordem das urls. Os demais argumentos vão para baixa_url.
+    """
+    with ThreadPoolExecutor(max_workers=conexoes) as executor:
+        return await asyncio.gather(*(baixa_url(url, executor, cache, **kwargs) for url in urls))
+
+
+def baixa_sequencias(sequencias, url_modelo=URL_DETALHES, conexoes=8,
+                     diretorio_cache=DIRETORIO_CACHE, **kwargs):
+    """
+    Baixa as respostas das 'sequencias' do KartaView (ou de qualquer
+    lista de parâmetros que preencha '{sequencia}' em 'url_modelo',
+    e.g. páginas) e retorna um dicionário sequência -> objeto limpo,
+    como o retornado por clean_extracted.
+
+    Pode ser chamada também de dentro de um laço de eventos já em
+    execução (e.g. num notebook do Jupyter): nesse caso os downloads
+    rodam num laço próprio em outra thread. Em código assíncrono
+    prefira `await baixa_urls(...)`.
+    """
+    cache = CacheRespostas(diretorio_cache) if diretorio_cache else None
+    urls = [url_modelo.format(sequencia=s) for s in sequencias]
+    corrotina = baixa_urls(urls, conexoes=conexoes, cache=cache, **kwargs)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        respostas = asyncio.run(corrotina)
+    else:
+        # asyncio.run não pode ser chamado com um laço já rodando nesta thread.
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            respostas = executor.submit(asyncio.run, corrotina).result()
+
+    limpos = {}
+    for sequencia, dados in zip(sequencias, respostas):
+        txt = dados.decode("utf-8")
+        first_pos, last_pos = get_photo_array_positions(txt)
+        limpos[sequencia] = clean_extracted("{" + txt[first_pos:last_pos] + "}")
+    return limpos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Baixa concorrentemente sequências do KartaView e gera os arquivos cleaned_<sequencia>.json.")
+    parser.add_argument(
+        'sequencias',
+        type=str,
+        nargs='+',
+        help="Os identificadores das sequências."
+    )
+    parser.add_argument('--url', type=str, default=URL_DETALHES,
+                        help="Modelo da url, com '{sequencia}' no lugar do identificador.")
+    parser.add_argument('--conexoes', type=int, default=8,
+                        help="Número máximo de downloads simultâneos.")
+    parser.add_argument('--cache', type=str, default=DIRETORIO_CACHE,
+                        help="Diretório do cache de respostas.")
+
+    args = parser.parse_args()
+    inicio = time.time()
+    limpos = baixa_sequencias(args.sequencias, args.url, args.conexoes, args.cache)
+    for sequencia, clean in limpos.items():
+        with open(f"cleaned_{sequencia}.json", "w") as cjf:
+            cjf.write(json.dumps(clean))
+    print(f"{len(limpos)} sequências em {time.time() - inicio:.1f} segundos")
@@ -7,17 +7,17 @@ Original file is located at
     https://colab.research.google.com/drive/1eG41ks96W9td4ZliuyMcUhCL1x0Utfc3
 """
 
-import matplotlib.pyplot as plt
-
 from datetime import datetime
 import json
 
 import warnings
 import numpy as np
-from pyproj import Proj, transform
 
-"""# para ignorar todos os warnings"""
-warnings.filterwarnings('ignore')
+from photos_extract import make_extract_photos_JSON, get_photo_array_positions, clean_extracted
+
+# Arquivo com a resposta do KartaView e faixa de pontos usados por padrão na função main.
+ARQUIVO_JSON = "sample1.json"
+FAIXA_DE_PONTOS = range(1000, 1100)
 
 """# O formato JSON
 Referência: [json.org](https://www.json.org/json-en.html)
@@ -62,26 +62,11 @@ Esses dados estão formatados usando-se o formato JSON de JavaScript Object Nota
 """
 
 
-
-
-arquivo_json = "sample1.json"
-
-with open(arquivo_json, "r") as f:
-    pontos = f.read()
-    pontos = json.loads(pontos)
-
-print(f"Chaves na raiz - \n{pontos.keys()}\n")
-print(f"Chaves do objeto na chave 'status' - \n{pontos['status'].keys()}\n")
-print(f"Chaves do objeto na chave 'osv' - \n{pontos['osv'].keys()}")
-
 """Seguindo a sequencia de chaves 'osv' -> 'photos' chegamos à uma sequência de objetos.
 
 Cada um destes objetos representa os metadados de uma imagem tomada em um ponto do trajeto escolhido no KartaView.
 """
 
-# Exemplo de um objeto na chave 'photos':
-pontos['osv']['photos'][0]
-
 """Podemos observar que muitos dos campos parecem ter utilidade apenas para a aplicação do KartaView.
 
 Para simplificar a análise vamos criar um novo arquivo JSON (chamado extractedque contenha um único objeto raiz com um único par chave/valor. Este par será o campo 'photos' e a sequência para a qual ele é chave:
@@ -108,39 +93,6 @@ Para simplificar a análise vamos criar um novo arquivo JSON (chamado extractedq
 
 """
 
-from photos_extract import make_extract_photos_JSON, get_photo_array_positions, clean_extracted
-
-jsonfile = 'sample1.json'
-
-extracted_filename = "extracted_" + jsonfile
-cleaned_filename = "cleaned_" + jsonfile
-
-with open(jsonfile, "r") as jf:
-        # Aqui o array 'photos' é extraído e colocado 
-        # em outro arquivo (com o prefixo extracted_),
-        # para facilitar o processamento do array.
-        #
-        # Em seguida usamos a função clean_extracted para
-        # criar um terceiro arquivo (com prefixo _cleaned)
-        # que contenha somente os campos de interesse para
-        # a análise.
-        txt = jf.read()
-        extracted_str = make_extract_photos_JSON(extracted_filename, txt)
-
-        with open(jsonfile, "r") as jf:
-            # Aqui o array 'photos' é extraído e colocado
-            # em outro arquivo (com o prefixo extracted_),
-            # para facilitar o processamento do array.
-            #
-            # Em seguida usamos a função clean_extracted para
-            # criar um terceiro arquivo (com prefixo _cleaned)
-            # que contenha somente os campos de interesse para
-            # a análise.
-            txt = jf.read()
-
-            with open(cleaned_filename, "w") as cjf:
-                cjf.write(json.dumps(clean_extracted(extracted_str)))
-
 """### Exercício
 
 Usando o arquivo 'extracted_sample1.json' gerado na seção anterior crie um novo arquivo JSON chamado 'cleaned_sample1.json' em que cada objeto da sequência 'photos' contém somente os campos:
@@ -170,20 +122,6 @@ Ou seja, o novo arquivo gerado a partir do 'extracted_sample1.json' deverá segu
 O trajeto pode conter muitos pontos (e.g. 7800+ no JSON anterior). Para facilitar a nossa vida e a análise, vamos selecionar um conjunto menor de pontos para este exercício.
 """
 
-# Vamos carregar os pontos (do JSON filtrado) na variável pontos.
-arquivo_pontos = "cleaned_sample1.json"
-
-with open(arquivo_pontos, "r") as f:
-    pontos = f.read()
-    pontos = json.loads(pontos)
-    pontos = pontos['photos']
-
-# Aqui escolhemos quais pontos iremos usar no intervalo entre [0-7847]
-faixa_de_pontos = range(1000, 1100)
-
-# Um ponto da rota escolhida é um objeto com as seguintes propriedades
-pontos[faixa_de_pontos[0]]
-
 """# Medindo distâncias
 
 ## Funções auxiliares
@@ -240,6 +178,8 @@ def get_point_coords_proj(index, points_object):
     lat = float(lat)
     lng = points_object[index]['lng']
     lng = float(lng)
+    from pyproj import Proj, transform
+
     p = np.array((lng, lat))
     p = transform(Proj(init='epsg:4326'), Proj(init='epsg:3857'), p[0], p[1])
     return p
@@ -275,17 +215,6 @@ Usamos a função auxiliar get_point_coords_proj, cujas coordenadas
 de retorno usam unidades de medida em metros.
 """
 
-pp1 = get_point_coords_proj(faixa_de_pontos[0], pontos)
-
-pp2 = get_point_coords_proj(faixa_de_pontos[1], pontos)
-
-# Note que aqui temos uma unidade de metros à leste
-# (ou oeste em caso negativo) e à norte (ou sul
-# em caso negativo) de um dado local no planeta.
-
-print(f'easting pp1: {pp1[0]} m; northing pp1: {pp1[1]} m')
-print(f'easting pp2: {pp2[0]} m; northing pp2: {pp2[1]} m')
-
 """## Exercício 2
 
 ### Medindo a distância entre dois pontos
@@ -303,24 +232,6 @@ def distancia_euclidiana(v1, v2):
     """
     return ((v1[0]-v2[0])**2 + (v1[1]-v2[1])**2)**(1/2)
 
-# Desta vez a distância resultante pode ser interpretada
-# fisicamente em metros.
-
-print(f'A distância entre pp1 e pp2 é: {distancia_euclidiana(pp1, pp2)} metros.')
-
-# Teste artificial
-
-pv1 = np.array([1, 1]) # Ponto x = 1, y = 1
-pv2 = np.array([1, -1]) # Ponto x = 2, y = 0
-
-print(f'A distância entre pv1 e pv2 é 2')
-print(f'A distância retornada pela função implementada foi {distancia_euclidiana(pv1, pv2)}\n')
-if distancia_euclidiana(pv1, pv2) == 2:
-    print("A distância foi calculada corretamente")
-else:
-    print("A distância foi calculada incorretamente\n")
-    print(f"O erro entre o esperado e o calculado foi {2 - distancia_euclidiana(pv1, pv2)}")
-
 """### Exercício - Visualizando o comprimento de cada trecho
 
 Usando a função criada no exercício anterior vamos agora ver a distância percorrida pelo veículo a cada passo do sub-trajeto selecionado:
@@ -344,8 +255,84 @@ Dica, você pode usar a linha abaixo para imprimir uma vez que a distância foi
 `print(f'trecho {i} {i+1} ; d = {dist}')`
 """
 
-for i in faixa_de_pontos:
-    pp1 = get_point_coords_proj(i, pontos)
-    pp2 = get_point_coords_proj(i+1, pontos)
-    dist = distancia_euclidiana(pp1, pp2)
-    print(f'trecho {i} a {i+1} ; d = {dist}')
\ No newline at end of file
+
+def main(jsonfile=ARQUIVO_JSON, faixa_de_pontos=FAIXA_DE_PONTOS):
+    # para ignorar todos os warnings
+    warnings.filterwarnings('ignore')
+
+    with open(jsonfile, "r") as f:
+        pontos = f.read()
+        pontos = json.loads(pontos)
+
+    print(f"Chaves na raiz - \n{pontos.keys()}\n")
+    print(f"Chaves do objeto na chave 'status' - \n{pontos['status'].keys()}\n")
+    print(f"Chaves do objeto na chave 'osv' - \n{pontos['osv'].keys()}")
+
+    # Exemplo de um objeto na chave 'photos':
+    print(pontos['osv']['photos'][0])
+
+    extracted_filename = "extracted_" + jsonfile
+    cleaned_filename = "cleaned_" + jsonfile
+
+    with open(jsonfile, "r") as jf:
+        # Aqui o array 'photos' é extraído e colocado
+        # em outro arquivo (com o prefixo extracted_),
+        # para facilitar o processamento do array.
+        #
+        # Em seguida usamos a função clean_extracted para
+        # criar um terceiro arquivo (com prefixo _cleaned)
+        # que contenha somente os campos de interesse para
+        # a análise.
+        txt = jf.read()
+        extracted_str = make_extract_photos_JSON(extracted_filename, txt)
+
+        with open(cleaned_filename, "w") as cjf:
+            cjf.write(json.dumps(clean_extracted(extracted_str)))
+
+    # Vamos carregar os pontos (do JSON filtrado) na variável pontos.
+    with open(cleaned_filename, "r") as f:
+        pontos = f.read()
+        pontos = json.loads(pontos)
+        pontos = pontos['photos']
+
+    # Um ponto da rota escolhida é um objeto com as seguintes propriedades
+    print(pontos[faixa_de_pontos[0]])
+
+    pp1 = get_point_coords_proj(faixa_de_pontos[0], pontos)
+
+    pp2 = get_point_coords_proj(faixa_de_pontos[1], pontos)
+
+    # Note que aqui temos uma unidade de metros à leste
+    # (ou oeste em caso negativo) e à norte (ou sul
+    # em caso negativo) de um dado local no planeta.
+
+    print(f'easting pp1: {pp1[0]} m; northing pp1: {pp1[1]} m')
+    print(f'easting pp2: {pp2[0]} m; northing pp2: {pp2[1]} m')
+
+    # Desta vez a distância resultante pode ser interpretada
+    # fisicamente em metros.
+
+    print(f'A distância entre pp1 e pp2 é: {distancia_euclidiana(pp1, pp2)} metros.')
+
+    # Teste artificial
+
+    pv1 = np.array([1, 1]) # Ponto x = 1, y = 1
+    pv2 = np.array([1, -1]) # Ponto x = 2, y = 0
+
+    print(f'A distância entre pv1 e pv2 é 2')
+    print(f'A distância retornada pela função implementada foi {distancia_euclidiana(pv1, pv2)}\n')
+    if distancia_euclidiana(pv1, pv2) == 2:
+        print("A distância foi calculada corretamente")
+    else:
+        print("A distância foi calculada incorretamente\n")
+        print(f"O erro entre o esperado e o calculado foi {2 - distancia_euclidiana(pv1, pv2)}")
+
+    for i in faixa_de_pontos:
+        pp1 = get_point_coords_proj(i, pontos)
+        pp2 = get_point_coords_proj(i+1, pontos)
+        dist = distancia_euclidiana(pp1, pp2)
+        print(f'trecho {i} a {i+1} ; d = {dist}')
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,87 @@ def get_photo_array_positions(txt):
     return s, e + len("}]")
 
 
+# Velocidade (m/s) acima da qual o deslocamento entre duas fotos
+# consecutivas é considerado um salto do GPS (~250 km/h).
+VEL_MAX_SALTO = 70.0
+
+# Raio médio da Terra (IUGG) em metros; o mesmo de atividade_3/distancias.py.
+RAIO_TERRA = 6371008.8
+
+
+def ordena_e_remove_duplicados(photos):
+    """
+    photos é a sequência de objetos da chave 'photos'.
+
+    Retorna uma tupla (indices, fora_de_ordem) em que 'indices' são as
+    posições, em 'photos', dos objetos que devem ser mantidos, já na
+    ordem crescente de 'shot_date', e 'fora_de_ordem' são as posições
+    dos objetos cujo 'shot_date' é anterior ao de algum objeto que os
+    precede na sequência original.
+
+    São removidos os objetos com 'id' repetido (entre os que têm 'id')
+    e os que repetem exatamente a posição ('lat', 'lng') e o
+    'shot_date' de outro objeto; em ambos os casos fica a primeira
+    ocorrência.
+    """
+    # numpy só é importado aqui para que a extração (get_photo_array_positions)
+    # não pague o custo de importá-lo.
+    import numpy as np
+
+    if len(photos) == 0:
+        return np.array([], dtype=int), np.array([], dtype=int)
+
+    tempos = np.array([p['shot_date'] for p in photos], dtype='datetime64[s]').astype(np.int64)
+    lat = np.array([float(p['lat']) for p in photos])
+    lng = np.array([float(p['lng']) for p in photos])
+
+    fora_de_ordem = np.flatnonzero(tempos < np.maximum.accumulate(tempos))
+
+    # Ordenação estável: fotos do mesmo segundo mantêm a ordem da API.
+    ordem = np.argsort(tempos, kind='stable')
+    manter = np.zeros(len(photos), dtype=bool)
+
+    chaves = np.column_stack((tempos[ordem], lat[ordem], lng[ordem]))
+    _, primeiros = np.unique(chaves, axis=0, return_index=True)
+    manter[primeiros] = True
+
+    ids = [photos[i].get('id') for i in ordem]
+    com_id = np.array([i is not None for i in ids])
+    if np.any(com_id):
+        posicoes = np.flatnonzero(com_id)
+        _, primeiros = np.unique(np.array([ids[i] for i in posicoes], dtype=str), return_index=True)
+        unicos = ~com_id
+        unicos[posicoes[primeiros]] = True
+        manter &= unicos
+
+    return ordem[manter], fora_de_ordem
+
+
+def detecta_saltos(photos, vel_max=VEL_MAX_SALTO):
+    """
+    photos é uma sequência de objetos ordenada por 'shot_date'.
+
+    Retorna as posições dos objetos que só poderiam ser alcançados a
+    partir do objeto anterior com velocidade maior que 'vel_max' (m/s).
+    Fotos do mesmo segundo usam um intervalo de um segundo.
+    """
+    import numpy as np
+
+    if len(photos) < 2:
+        return np.array([], dtype=int)
+
+    tempos = np.array([p['shot_date'] for p in photos], dtype='datetime64[s]').astype(np.int64)
+    lat = np.radians([float(p['lat']) for p in photos])
+    lng = np.radians([float(p['lng']) for p in photos])
+
+    # Fórmula de haversine (como distancias.distancia_haversine).
+    a = (np.sin(np.diff(lat) / 2) ** 2
+         + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lng) / 2) ** 2)
+    dist = 2 * RAIO_TERRA * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+    dt = np.maximum(np.diff(tempos), 1)
+    return np.flatnonzero(dist / dt > vel_max) + 1
+
+
 def clean_extracted(txt):
     """
     txt é a mensagem (string) em JSON contendo somente
@@ -19,14 +100,24 @@ def clean_extracted(txt):
     único objeto raiz com um par cuja chave é 'photos'
     mas os objetos da sequência agora contém somente
     os campos 'lat', 'lng', 'heading' e 'shot_date'.
+
+    Os objetos são ordenados por 'shot_date' e as fotos
+    duplicadas são removidas (ver ordena_e_remove_duplicados),
+    de forma que as análises seguintes podem contar com o
+    tempo crescente. O objeto raiz ganha também a chave
+    'avisos', com os 'shot_date' das fotos que vieram fora
+    de ordem e as posições (na nova sequência) das fotos
+    com saltos de GPS (ver detecta_saltos).
     """
 
     # Modifique o código abaixo para que retorne a string
     # clean contendo a mensagem JSON definida acima.
 
     extract = json.loads(txt)
+    indices, fora_de_ordem = ordena_e_remove_duplicados(extract['photos'])
     photos = []
-    for item in extract['photos']:
+    for i in indices:
+        item = extract['photos'][i]
         photo = {
             'lat': item['lat'],
             'lng': item['lng'],
@@ -36,7 +127,11 @@ def clean_extracted(txt):
         photos.append(photo)
 
     clean = {
-        'photos': photos
+        'photos': photos,
+        'avisos': {
+            'fora_de_ordem': [extract['photos'][i]['shot_date'] for i in fora_de_ordem],
+            'saltos': detecta_saltos(photos).tolist(),
+        },
     }
 
     return clean
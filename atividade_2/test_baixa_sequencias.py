@@ -0,0 +1,141 @@
+"""
+Testes de baixa_sequencias.py contra um servidor HTTP local, sem
+acessar a API do KartaView. Execute a partir desta pasta com
+
+    python -m pytest test_baixa_sequencias.py
+"""
+
+import asyncio
+import json
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from baixa_sequencias import baixa_sequencias, baixa_url, baixa_urls
+
+
+def resposta_sequencia(sequencia):
+    # Resposta no formato de 'sample1.json', com duas fotos.
+    fotos = [
+        {'id': f"{sequencia}-1", 'lat': "32.70", 'lng': "-117.10", 'heading': "90",
+         'shot_date': "2020-01-01 10:00:00"},
+        {'id': f"{sequencia}-2", 'lat': "32.70", 'lng': "-117.09", 'heading': "90",
+         'shot_date': "2020-01-01 10:01:00"},
+    ]
+    resposta = {'status': {}, 'osv': {'sequence': sequencia, 'photos': fotos}}
+    return json.dumps(resposta, separators=(",", ":")).encode()
+
+
+class Servidor(BaseHTTPRequestHandler):
+    """
+    Rotas:
+    - /ok/<seq>: responde a sequência <seq>;
+    - /instavel/<seq>: responde 503 na primeira requisição e depois como /ok;
+    - /limitado/<seq>: responde 429 na primeira requisição e depois como /ok;
+    - /ausente/<seq>: responde sempre 404;
+    - /lento/<ms>/<seq>: como /ok, depois de esperar <ms> milissegundos.
+    """
+    requisicoes = {}
+    trava = threading.Lock()
+
+    def do_GET(self):
+        with self.trava:
+            n = self.requisicoes[self.path] = self.requisicoes.get(self.path, 0) + 1
+        partes = self.path.strip("/").split("/")
+        rota, sequencia = partes[0], partes[-1]
+        if rota == 'ausente' or (rota in ('instavel', 'limitado') and n == 1):
+            self.send_error({'ausente': 404, 'instavel': 503, 'limitado': 429}[rota])
+            return
+        if rota == 'lento':
+            time.sleep(int(partes[1]) / 1000)
+        corpo = resposta_sequencia(sequencia)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestBaixaSequencias(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.servidor = ThreadingHTTPServer(("127.0.0.1", 0), Servidor)
+        cls.base = f"http://127.0.0.1:{cls.servidor.server_address[1]}"
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+
+    def setUp(self):
+        Servidor.requisicoes.clear()
+        self.diretorio = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.diretorio)
+
+    def baixa(self, url, **kwargs):
+        async def baixa():
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                return await baixa_url(url, executor, espera=0, **kwargs)
+        return asyncio.run(baixa())
+
+    def test_repete_erro_5xx(self):
+        dados = self.baixa(f"{self.base}/instavel/a")
+        self.assertEqual(dados, resposta_sequencia("a"))
+        self.assertEqual(Servidor.requisicoes["/instavel/a"], 2)
+
+    def test_repete_erro_429(self):
+        dados = self.baixa(f"{self.base}/limitado/a")
+        self.assertEqual(dados, resposta_sequencia("a"))
+        self.assertEqual(Servidor.requisicoes["/limitado/a"], 2)
+
+    def test_nao_repete_erro_4xx(self):
+        with self.assertRaises(urllib.error.HTTPError) as erro:
+            self.baixa(f"{self.base}/ausente/a")
+        self.assertEqual(erro.exception.code, 404)
+        self.assertEqual(Servidor.requisicoes["/ausente/a"], 1)
+
+    def test_tentativas_invalidas(self):
+        with self.assertRaises(ValueError):
+            self.baixa(f"{self.base}/ok/a", tentativas=0)
+        self.assertEqual(Servidor.requisicoes, {})
+
+    def test_segunda_execucao_usa_cache(self):
+        sequencias = ["a", "b", "c"]
+        url = self.base + "/ok/{sequencia}"
+        primeira = baixa_sequencias(sequencias, url, diretorio_cache=self.diretorio, espera=0)
+        self.assertEqual(sum(Servidor.requisicoes.values()), 3)
+        segunda = baixa_sequencias(sequencias, url, diretorio_cache=self.diretorio, espera=0)
+        self.assertEqual(sum(Servidor.requisicoes.values()), 3)
+        self.assertEqual(primeira, segunda)
+        self.assertEqual(len(primeira["a"]['photos']), 2)
+
+    def test_laco_de_eventos_em_execucao(self):
+        # Como numa célula do Jupyter, que já roda dentro de um laço de eventos.
+        async def celula():
+            return baixa_sequencias(["a"], self.base + "/ok/{sequencia}",
+                                    diretorio_cache=None, espera=0)
+        limpos = asyncio.run(celula())
+        self.assertEqual(len(limpos["a"]['photos']), 2)
+
+    def test_resultados_na_ordem_das_urls(self):
+        # As primeiras urls demoram mais, então terminam por último.
+        atrasos = [300, 200, 100, 0]
+        urls = [f"{self.base}/lento/{ms}/{i}" for i, ms in enumerate(atrasos)]
+        respostas = asyncio.run(baixa_urls(urls, conexoes=len(urls), espera=0))
+        self.assertEqual(respostas, [resposta_sequencia(str(i)) for i in range(len(urls))])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,208 @@
+"""
+Processamento de viagens maiores que a memória, em blocos.
+
+Os scripts dos exercícios carregam a lista `pontos` inteira e depois
+mais uma cópia completa (`complete_points`). Aqui a viagem é guardada em
+colunas, um arquivo .npy por coluna num diretório:
+
+    <diretorio>/lat.npy, lng.npy, shot_date.npy, easting.npy, northing.npy
+
+e processada em blocos de tamanho fixo, lidos e escritos com np.memmap.
+O estado necessário para continuar de um bloco para o outro (último
+ponto, distância acumulada e instante inicial) é carregado entre os
+blocos, de modo que o resultado é idêntico ao do cálculo com a viagem
+inteira em memória (Viagem, em viagem.py): as somas acumuladas são feitas
+na mesma ordem.
+
+O tamanho dos blocos é escolhido a partir de 'memoria_max' (em bytes),
+que limita a memória usada pelos vetores de cada bloco. Também a
+gravação das colunas (grava_colunas) consome os pontos em blocos, a
+partir de qualquer iterável, de modo que nenhuma etapa precisa da
+viagem inteira em memória.
+"""
+
+import itertools
+import os
+
+import numpy as np
+
+from distancias import distancias_consecutivas, epsg_utm
+from projecao import projeta
+
+MEMORIA_MAX = 256 * 2 ** 20  # 256 MiB
+
+# Colunas que toda viagem gravada tem.
+COLUNAS = ('lat', 'lng', 'shot_date')
+
+# Estimativa de bytes por ponto usados num bloco: as colunas lidas, as
+# escritas e os vetores intermediários (diferenças, quadrados, etc.).
+BYTES_POR_PONTO = 16 * 8
+
+
+def caminho_coluna(diretorio, nome):
+    return os.path.join(diretorio, f"{nome}.npy")
+
+
+def abre_coluna(diretorio, nome, modo='r'):
+    """Abre a coluna 'nome' do 'diretorio' como np.memmap."""
+    return np.load(caminho_coluna(diretorio, nome), mmap_mode=modo)
+
+
+def cria_coluna(diretorio, nome, n, dtype=np.float64):
+    """Cria (ou sobrescreve) a coluna 'nome' com 'n' elementos, como np.memmap."""
+    os.makedirs(diretorio, exist_ok=True)
+    return np.lib.format.open_memmap(caminho_coluna(diretorio, nome), mode='w+',
+                                     dtype=dtype, shape=(n,))
+
+
+def _dtype(nome):
+    return np.int64 if nome == 'shot_date' else np.float64
+
+
+def _colunas_do_bloco(pontos, com_projecao):
+    colunas = {
+        'lat': np.array([float(p['lat']) for p in pontos]),
+        'lng': np.array([float(p['lng']) for p in pontos]),
+        'shot_date': np.array([p['shot_date'] for p in pontos],
+                              dtype='datetime64[s]').astype(np.int64),
+    }
+    if com_projecao:
+        colunas['easting'] = np.array([float(p['easting']) for p in pontos])
+        colunas['northing'] = np.array([float(p['northing']) for p in pontos])
+    return colunas
+
+
+def grava_colunas(diretorio, points_object, n=None, memoria_max=MEMORIA_MAX):
+    """
+    Grava as colunas 'lat', 'lng', 'shot_date' (segundos desde 1970) e,
+    se os pontos as tiverem, 'easting' e 'northing' dos pontos
+    "points_object" no 'diretorio'.
+
+    "points_object" pode ser qualquer iterável de pontos (e.g. um
+    gerador que lê um arquivo aos poucos): os pontos são consumidos e
+    gravados em blocos de tamanho_bloco(memoria_max), sem que a viagem
+    inteira precise estar em memória. 'n' é o número de pontos; se
+    omitido, é len(points_object). Se o primeiro ponto tem `easting` e
+    `northing`, todos precisam ter. Retorna o número de pontos gravados.
+    """
+    if n is None:
+        try:
+            n = len(points_object)
+        except TypeError:
+            raise TypeError("Informe 'n' (o número de pontos) para um iterável sem len().") from None
+    pontos = iter(points_object)
+    bloco = tamanho_bloco(memoria_max)
+
+    colunas = None
+    gravados = 0
+    while True:
+        pedaco = list(itertools.islice(pontos, bloco))
+        if not pedaco:
+            break
+        if gravados + len(pedaco) > n:
+            raise ValueError(f"Há mais pontos que n = {n}.")
+        if colunas is None:
+            com_projecao = 'easting' in pedaco[0] and 'northing' in pedaco[0]
+            nomes = COLUNAS + (('easting', 'northing') if com_projecao else ())
+            colunas = {nome: cria_coluna(diretorio, nome, n, _dtype(nome)) for nome in nomes}
+        for nome, valores in _colunas_do_bloco(pedaco, com_projecao).items():
+            colunas[nome][gravados:gravados + len(pedaco)] = valores
+        gravados += len(pedaco)
+
+    if colunas is None:
+        for nome in COLUNAS:
+            cria_coluna(diretorio, nome, 0, _dtype(nome))
+        return 0
+    if gravados != n:
+        raise ValueError(f"Foram lidos {gravados} pontos, mas n = {n}.")
+    for coluna in colunas.values():
+        coluna.flush()
+    return gravados
+
+
+def tamanho_bloco(memoria_max=MEMORIA_MAX):
+    """Número de pontos por bloco que cabe em 'memoria_max' bytes."""
+    return max(2, int(memoria_max // BYTES_POR_PONTO))
+
+
+def processa_em_blocos(diretorio, saida=None, metodo=None, memoria_max=MEMORIA_MAX,
+                       estatisticas=None):
+    """
+    Calcula as colunas 'distancia_percorrida' e 'tempo_decorrido' da
+    viagem guardada em 'diretorio' e as grava em 'saida' (por padrão, no
+    próprio 'diretorio'), processando no máximo tamanho_bloco(memoria_max)
+    pontos por vez.
+
+    Com metodo=None a distância é a euclidiana entre `easting`/`northing`
+    (que são calculados bloco a bloco se não existirem); os demais
+    métodos são os de distancias.METODOS, calculados a partir de lat/lng;
+    no método 'utm' a zona é escolhida uma vez para a viagem inteira,
+    como no cálculo em memória.
+
+    Se 'estatisticas' (e.g. estatisticas.EstatisticasViagem) for dado,
+    cada bloco é também passado para estatisticas.atualiza.
+    Retorna o número de pontos processados.
+    """
+    if saida is None:
+        saida = diretorio
+    lat = abre_coluna(diretorio, 'lat')
+    lng = abre_coluna(diretorio, 'lng')
+    shot_date = abre_coluna(diretorio, 'shot_date')
+    tem_projecao = os.path.exists(caminho_coluna(diretorio, 'easting'))
+    if tem_projecao:
+        easting = abre_coluna(diretorio, 'easting')
+        northing = abre_coluna(diretorio, 'northing')
+
+    n = len(lat)
+    distancia = cria_coluna(saida, 'distancia_percorrida', n)
+    tempo = cria_coluna(saida, 'tempo_decorrido', n, np.int64)
+    if n == 0:
+        return 0
+
+    bloco = tamanho_bloco(memoria_max)
+    t0 = int(shot_date[0])
+    epsg = epsg_utm(lat, lng) if metodo == 'utm' else None
+    # Estado carregado entre blocos: o último ponto do bloco anterior
+    # (lat, lng, easting, northing) e a distância acumulada até ele.
+    anterior = None
+    acumulada = 0.0
+
+    for inicio in range(0, n, bloco):
+        fim = min(inicio + bloco, n)
+        b_lat = np.asarray(lat[inicio:fim])
+        b_lng = np.asarray(lng[inicio:fim])
+        if metodo is None:
+            if tem_projecao:
+                b_e = np.asarray(easting[inicio:fim])
+                b_n = np.asarray(northing[inicio:fim])
+            else:
+                b_e, b_n = projeta(b_lng, b_lat)
+            x, y = b_e, b_n
+            if anterior is not None:
+                x = np.concatenate(([anterior[2]], b_e))
+                y = np.concatenate(([anterior[3]], b_n))
+            passos = np.hypot(np.diff(x), np.diff(y))
+            ultimo = (b_lat[-1], b_lng[-1], b_e[-1], b_n[-1])
+        else:
+            la, lo = b_lat, b_lng
+            if anterior is not None:
+                la = np.concatenate(([anterior[0]], b_lat))
+                lo = np.concatenate(([anterior[1]], b_lng))
+            passos = distancias_consecutivas(la, lo, metodo, epsg)
+            ultimo = (b_lat[-1], b_lng[-1], None, None)
+
+        # Mesma ordem de soma que np.cumsum sobre a viagem inteira.
+        d = np.cumsum(np.concatenate(([acumulada], passos)))
+        if anterior is not None:
+            d = d[1:]
+        distancia[inicio:fim] = d
+        tempo[inicio:fim] = np.asarray(shot_date[inicio:fim]) - t0
+        if estatisticas is not None:
+            estatisticas.atualiza(d, tempo[inicio:fim])
+
+        acumulada = d[-1]
+        anterior = ultimo
+
+    distancia.flush()
+    tempo.flush()
+    return n
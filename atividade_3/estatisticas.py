@@ -0,0 +1,229 @@
+"""
+Estatísticas online (em fluxo) das métricas de uma viagem.
+
+velocidade_media e as médias por trecho eram calculadas a partir das
+listas completas de distâncias e tempos. As classes abaixo são
+atualizadas à medida que os pontos chegam, em blocos de qualquer
+tamanho, e guardam apenas uma quantidade fixa de números por viagem:
+
+- EstatisticasOnline: contagem, média, variância (algoritmo de Welford,
+  na versão para blocos de Chan et al.), mínimo e máximo;
+- EsbocoQuantis: histograma com baldes em escala logarítmica, que
+  estima quantis com erro relativo limitado por 'precisao';
+- EstatisticasViagem: junta as duas acima para as velocidades de cada
+  passo e resume as velocidades médias dos trechos em movimento.
+
+Todas têm o método combina, que junta o resultado de dois processos
+(e.g. cada um tratando um conjunto de viagens) como se todos os dados
+tivessem passado por um só.
+"""
+
+import math
+
+import numpy as np
+
+
+class EstatisticasOnline:
+    """Contagem, média, variância, mínimo e máximo de um fluxo de valores."""
+
+    def __init__(self):
+        self.n = 0
+        self.media = 0.0
+        self._m2 = 0.0
+        self.minimo = math.inf
+        self.maximo = -math.inf
+
+    def atualiza(self, valores):
+        valores = np.asarray(valores, dtype=float).ravel()
+        valores = valores[np.isfinite(valores)]
+        if len(valores) == 0:
+            return self
+        bloco = EstatisticasOnline()
+        bloco.n = len(valores)
+        bloco.media = float(np.mean(valores))
+        bloco._m2 = float(np.sum((valores - bloco.media) ** 2))
+        bloco.minimo = float(np.min(valores))
+        bloco.maximo = float(np.max(valores))
+        return self.combina(bloco)
+
+    def combina(self, outra):
+        """Junta 'outra' a esta estatística (no lugar) e a retorna."""
+        if outra.n == 0:
+            return self
+        n = self.n + outra.n
+        delta = outra.media - self.media
+        self.media += delta * outra.n / n
+        self._m2 += outra._m2 + delta ** 2 * self.n * outra.n / n
+        self.n = n
+        self.minimo = min(self.minimo, outra.minimo)
+        self.maximo = max(self.maximo, outra.maximo)
+        return self
+
+    @property
+    def variancia(self):
+        return self._m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def desvio_padrao(self):
+        return math.sqrt(self.variancia)
+
+
+class EsbocoQuantis:
+    """
+    Esboço de quantis de valores não negativos. Cada balde i conta os
+    valores em (gamma^(i-1), gamma^i], com gamma = (1 + precisao) /
+    (1 - precisao), então o quantil estimado tem erro relativo de no
+    máximo 'precisao'. O número de baldes é limitado pela razão entre o
+    maior e o menor valor, e não pela quantidade de valores.
+    """
+
+    def __init__(self, precisao=0.01, minimo=1e-3):
+        self.precisao = precisao
+        self.gamma = (1 + precisao) / (1 - precisao)
+        self._log_gamma = math.log(self.gamma)
+        # Valores menores que 'minimo' (e.g. veículo parado) vão para o balde zero.
+        self.minimo = minimo
+        self.zeros = 0
+        self.baldes = {}
+
+    @property
+    def n(self):
+        return self.zeros + sum(self.baldes.values())
+
+    def atualiza(self, valores):
+        valores = np.asarray(valores, dtype=float).ravel()
+        valores = valores[np.isfinite(valores) & (valores >= 0)]
+        pequenos = valores < self.minimo
+        self.zeros += int(np.count_nonzero(pequenos))
+        indices = np.ceil(np.log(valores[~pequenos]) / self._log_gamma).astype(np.int64)
+        for i, c in zip(*np.unique(indices, return_counts=True)):
+            self.baldes[int(i)] = self.baldes.get(int(i), 0) + int(c)
+        return self
+
+    def combina(self, outro):
+        if outro.gamma != self.gamma:
+            raise ValueError("Só é possível combinar esboços com a mesma precisão.")
+        self.zeros += outro.zeros
+        for i, c in outro.baldes.items():
+            self.baldes[i] = self.baldes.get(i, 0) + c
+        return self
+
+    def quantil(self, q):
+        """Estimativa do quantil 'q' (entre 0 e 1)."""
+        n = self.n
+        if n == 0:
+            return math.nan
+        posicao = q * (n - 1)
+        acumulado = self.zeros
+        if posicao < acumulado:
+            return 0.0
+        for i in sorted(self.baldes):
+            acumulado += self.baldes[i]
+            if posicao < acumulado:
+                return 2 * self.gamma ** i / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.baldes) / (self.gamma + 1)
+
+
+class EstatisticasViagem:
+    """
+    Estatísticas de velocidade de uma viagem, alimentadas com blocos
+    consecutivos de distância percorrida (m) e tempo decorrido (s).
+
+    Um trecho em movimento termina quando a velocidade de um passo fica
+    abaixo de 'vel_min' ou o intervalo entre duas fotos passa de
+    'lacuna_max' (como em simplificacao.detecta_trechos). Dos trechos
+    guarda-se apenas um resumo: 'trechos' (EstatisticasOnline das
+    velocidades médias de cada trecho, inclusive a contagem) e a
+    distância e o tempo totais em movimento.
+    """
+
+    def __init__(self, vel_min=0.5, lacuna_max=60, precisao=0.01):
+        self.vel_min = vel_min
+        self.lacuna_max = lacuna_max
+        self.velocidade = EstatisticasOnline()
+        self.quantis = EsbocoQuantis(precisao)
+        self.trechos = EstatisticasOnline()
+        self.distancia_total = 0.0
+        self.tempo_total = 0.0
+        self.distancia_em_movimento = 0.0
+        self.tempo_em_movimento = 0.0
+        self._ultimo = None   # (distância, tempo) do último ponto visto
+        self._inicio = None   # (distância, tempo) do início do trecho atual
+        self._fim_trecho = None
+
+    def atualiza(self, distancia, tempo):
+        distancia = np.asarray(distancia, dtype=float)
+        tempo = np.asarray(tempo, dtype=float)
+        if len(distancia) == 0:
+            return self
+        if self._ultimo is not None:
+            distancia = np.concatenate(([self._ultimo[0]], distancia))
+            tempo = np.concatenate(([self._ultimo[1]], tempo))
+
+        dd = np.diff(distancia)
+        dt = np.diff(tempo)
+        self.distancia_total += float(np.sum(dd))
+        self.tempo_total += float(np.sum(dt))
+        vel = np.full(len(dd), np.nan)
+        np.divide(dd, dt, out=vel, where=dt > 0)
+        self.velocidade.atualiza(vel)
+        self.quantis.atualiza(vel)
+
+        with np.errstate(invalid='ignore'):
+            movimento = ~((vel < self.vel_min) | (dt > self.lacuna_max))
+        # Inícios e fins de trechos dentro do bloco; o laço abaixo passa
+        # apenas pelas transições, não por todos os pontos.
+        anterior = 1 if self._inicio is not None else 0
+        borda = np.diff(np.concatenate(([anterior], movimento.astype(np.int8))))
+        for i in np.flatnonzero(borda):
+            if borda[i] == 1:
+                self._inicio = (distancia[i], tempo[i])
+            else:
+                self._fim_trecho = (distancia[i], tempo[i])
+                self._fecha_trecho()
+        if self._inicio is not None:
+            self._fim_trecho = (distancia[-1], tempo[-1])
+        self._ultimo = (distancia[-1], tempo[-1])
+        return self
+
+    def _fecha_trecho(self):
+        (d0, t0), (d1, t1) = self._inicio, self._fim_trecho
+        if t1 > t0:
+            self.trechos.atualiza([(d1 - d0) / (t1 - t0)])
+            self.distancia_em_movimento += d1 - d0
+            self.tempo_em_movimento += t1 - t0
+        self._inicio = None
+
+    def finaliza(self):
+        """Fecha o trecho em andamento (chame ao fim da viagem)."""
+        if self._inicio is not None:
+            self._fecha_trecho()
+        return self
+
+    @property
+    def velocidade_media(self):
+        """Velocidade média das viagens (distância total / tempo total)."""
+        if self.tempo_total == 0:
+            return math.nan
+        return self.distancia_total / self.tempo_total
+
+    @property
+    def velocidade_em_movimento(self):
+        """Velocidade média considerando apenas os trechos em movimento."""
+        if self.tempo_em_movimento == 0:
+            return math.nan
+        return self.distancia_em_movimento / self.tempo_em_movimento
+
+    def combina(self, outra):
+        """
+        Junta as estatísticas de 'outra' viagem (ou conjunto de viagens)
+        a esta. Chame finaliza nas duas antes de combiná-las.
+        """
+        self.velocidade.combina(outra.velocidade)
+        self.quantis.combina(outra.quantis)
+        self.trechos.combina(outra.trechos)
+        self.distancia_total += outra.distancia_total
+        self.tempo_total += outra.tempo_total
+        self.distancia_em_movimento += outra.distancia_em_movimento
+        self.tempo_em_movimento += outra.tempo_em_movimento
+        return self
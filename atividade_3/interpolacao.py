@@ -0,0 +1,122 @@
+"""
+Interpolação da posição do veículo em instantes não amostrados.
+
+Ao invés de percorrer a lista de pontos procurando o `tempo_decorrido`
+mais próximo, montamos um índice temporal (vetores numpy ordenados pelo
+tempo) e respondemos vetores inteiros de consultas de uma vez, usando
+np.searchsorted para localizar o intervalo de cada instante e combinando
+os valores vizinhos de forma vetorizada.
+
+Métodos disponíveis:
+
+- 'linear': interpolação linear entre os dois pontos vizinhos;
+- 'cubica': interpolação cúbica de Hermite, com derivadas estimadas
+  por diferenças centradas;
+- 'modelo': nos instantes dentro de um trecho ajustado
+  (modelos.ajusta_trechos), a `distancia` vem do modelo daquele trecho;
+  fora dos trechos (paradas, antes do primeiro e depois do último) e
+  nas demais colunas, a interpolação é linear.
+
+Instantes fora do intervalo amostrado recebem o valor do extremo mais
+próximo (como em np.interp).
+"""
+
+import numpy as np
+
+from modelos import prediz
+
+METODOS = ('linear', 'cubica', 'modelo')
+
+
+def indice_temporal(tempo, **colunas):
+    """
+    Monta o índice temporal de um trajeto a partir do vetor 'tempo' e
+    das colunas dadas como argumentos nomeados (e.g. easting=...,
+    northing=..., distancia=...).
+
+    Os pontos são ordenados pelo tempo e pontos com o mesmo instante
+    (o `shot_date` tem resolução de um segundo) são substituídos pela
+    média deles. Retorna um dicionário com o vetor 'tempo' estritamente
+    crescente e as colunas correspondentes.
+    """
+    tempo = np.asarray(tempo, dtype=float)
+    tempo_unico, inverso, contagem = np.unique(tempo, return_inverse=True, return_counts=True)
+    indice = {'tempo': tempo_unico}
+    for nome, valores in colunas.items():
+        valores = np.asarray(valores, dtype=float)
+        indice[nome] = np.bincount(inverso, weights=valores, minlength=len(tempo_unico)) / contagem
+    return indice
+
+
+def indice_de_pontos(points_object):
+    """
+    Monta o índice temporal (ver indice_temporal) com as colunas
+    `easting`, `northing` e `distancia` a partir da lista de pontos
+    "points_object" de `cleaned_sample3.json`.
+    """
+    return indice_temporal(
+        [p['tempo_decorrido'] for p in points_object],
+        easting=[p['easting'] for p in points_object],
+        northing=[p['northing'] for p in points_object],
+        distancia=[p['distancia_percorrida'] for p in points_object],
+    )
+
+
+def _localiza(t, consultas):
+    # Retorna o índice i do intervalo [t[i], t[i+1]] de cada consulta
+    # e a fração u do intervalo, já limitada a [0, 1].
+    i = np.clip(np.searchsorted(t, consultas, side='right') - 1, 0, len(t) - 2)
+    u = np.clip((consultas - t[i]) / (t[i + 1] - t[i]), 0, 1)
+    return i, u
+
+
+def _derivadas(t, y):
+    # Derivadas nos pontos por diferenças centradas (unilaterais nas pontas).
+    m = np.empty_like(y)
+    m[1:-1] = (y[2:] - y[:-2]) / (t[2:] - t[:-2])
+    m[0] = (y[1] - y[0]) / (t[1] - t[0])
+    m[-1] = (y[-1] - y[-2]) / (t[-1] - t[-2])
+    return m
+
+
+def _hermite(t, y, i, u):
+    h = t[i + 1] - t[i]
+    m = _derivadas(t, y)
+    u2 = u * u
+    u3 = u2 * u
+    return ((2 * u3 - 3 * u2 + 1) * y[i] + (u3 - 2 * u2 + u) * h * m[i]
+            + (-2 * u3 + 3 * u2) * y[i + 1] + (u3 - u2) * h * m[i + 1])
+
+
+def interpola(indice, consultas, metodo='linear', ajuste=None, colunas=None):
+    """
+    Retorna um dicionário com o valor de cada coluna do 'indice' (ou só
+    das 'colunas' pedidas) nos instantes do vetor 'consultas'.
+
+    No método 'modelo', 'ajuste' deve ser o resultado de
+    modelos.ajusta_trechos sobre a distância percorrida.
+    """
+    if metodo not in METODOS:
+        raise ValueError(f"Método de interpolação desconhecido: {metodo!r}. Use um de {METODOS}.")
+    if metodo == 'modelo' and ajuste is None:
+        raise ValueError("O método 'modelo' precisa do 'ajuste' retornado por ajusta_trechos.")
+
+    t = indice['tempo']
+    consultas = np.asarray(consultas, dtype=float)
+    if colunas is None:
+        colunas = [nome for nome in indice if nome != 'tempo']
+    if len(t) == 1:
+        return {nome: np.full(consultas.shape, indice[nome][0]) for nome in colunas}
+
+    i, u = _localiza(t, consultas)
+    resultado = {}
+    for nome in colunas:
+        y = indice[nome]
+        if metodo == 'cubica':
+            resultado[nome] = _hermite(t, y, i, u)
+        else:
+            resultado[nome] = y[i] + u * (y[i + 1] - y[i])
+        if metodo == 'modelo' and nome == 'distancia':
+            modelo = prediz(ajuste, consultas)
+            resultado[nome] = np.where(np.isnan(modelo), resultado[nome], modelo)
+    return resultado
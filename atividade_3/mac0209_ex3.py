@@ -1,13 +1,12 @@
-import matplotlib.pyplot as plt
 import json
 import numpy as np
-from pyproj import Proj, transform
 import warnings
 from datetime import datetime
 
-
-""" para ignorar todos os warnings """
-warnings.filterwarnings('ignore')
+from distancias import get_lat_lng_arrays, distancia_acumulada
+from memoiza import CacheResultados, etapa
+from modelos import ajusta_trechos
+from simplificacao import get_trajeto_arrays, detecta_trechos
 
 """# Carregando o arquivo de dados do KartaView
 
@@ -18,13 +17,23 @@ Esses dados estão formatados usando-se o formato JSON de JavaScript Object Nota
 Um arquivo JSON é um arquivo de texto com uma mensagem estruturada com o formato JSON.
 """
 
-# Vamos carregar os pontos (do JSON filtrado) na variável pontos.
-arquivo_pontos = "cleaned_sample2.json"
-arquivo_pontos2 = "cleaned_sample3.json"
+# Arquivos e intervalo usados por padrão na função main.
+ARQUIVO_PONTOS = "cleaned_sample2.json"
+ARQUIVO_PONTOS2 = "cleaned_sample3.json"
+TINICIO = 3000
+TFIM = 3180
+
 
-with open(arquivo_pontos, "r") as f:
-    pontos = f.read()
-    pontos = json.loads(pontos)
+def carrega_pontos(arquivo):
+    """
+    Carrega a lista de pontos do arquivo JSON 'arquivo', aceitando
+    tanto uma lista de pontos quanto um objeto com a chave 'photos'.
+    """
+    with open(arquivo, "r") as f:
+        pontos = json.loads(f.read())
+    if isinstance(pontos, dict):
+        pontos = pontos['photos']
+    return pontos
 
 
 """# Medindo distâncias
@@ -87,6 +96,8 @@ def get_point_coords_proj(index, points_object):
     lat = float(lat)
     lng = points_object[index]['lng']
     lng = float(lng)
+    from pyproj import Proj, transform
+
     p = np.array((lng, lat))
     p = transform(Proj(init='epsg:4326'), Proj(init='epsg:3857'), p[0], p[1])
     return np.asarray(p)
@@ -171,35 +182,35 @@ Exercício 1C - Insira os valores calculados como novas propriedades dos pontos
 """
 
 
-# Dica, para pegar e calcular a diferença de tempo entre dois pontos você pode usar a função get_shot_time:
-tdelta = get_shot_time(1, pontos)-get_shot_time(0, pontos)
-print(f"A diferença entre dois objetos 'datetime' gera um objeto 'timedelta': {type(tdelta)}")
-print(f"Exemplo do objeto 'timedelta': {tdelta}")
-print(f'Segundos decorridos: {tdelta.seconds}')
-
-
 # Exercício 1 A, B e C.
-def exercicio_1(indice, pontos):
+def exercicio_1(indice, pontos, metodo=None):
     """
     Calcula as distancias percorridas e o tempo transcorrido associado a cada ponto.
     Insere os valores como elementos de cada item no dicionário postos
+
+    Por padrão a distância é a euclidiana entre `easting` e `northing` (EPSG:3857).
+    Se 'metodo' for um dos métodos de distancias.METODOS ('haversine', 'geodesica'
+    ou 'utm'), a distância percorrida é calculada em metros reais a partir de
+    'lat' e 'lng', de forma vetorizada.
     """
+    if metodo is not None:
+        lat, lng = get_lat_lng_arrays(pontos[:indice])
+        acumulada = distancia_acumulada(lat, lng, metodo)
     for i in range(indice):
         if i == 0:
             pontos[i]['distancia_percorrida'] = 0
             pontos[i]['tempo_decorrido'] = 0
         else:
-            s0 = np.asarray([pontos[i - 1]['easting'], pontos[i - 1]['northing']])
-            sf = np.asarray([pontos[i]['easting'], pontos[i]['northing']])
-            pontos[i]['distancia_percorrida'] = distancia_euclidiana(s0, sf) + pontos[i - 1]['distancia_percorrida']
+            if metodo is None:
+                s0 = np.asarray([pontos[i - 1]['easting'], pontos[i - 1]['northing']])
+                sf = np.asarray([pontos[i]['easting'], pontos[i]['northing']])
+                pontos[i]['distancia_percorrida'] = distancia_euclidiana(s0, sf) + pontos[i - 1]['distancia_percorrida']
+            else:
+                pontos[i]['distancia_percorrida'] = float(acumulada[i])
             pontos[i]['tempo_decorrido'] = (get_shot_time(i, pontos) - get_shot_time(i - 1, pontos)).seconds + \
                                             pontos[i - 1]['tempo_decorrido']
 
 
-exercicio_1(len(pontos), pontos)
-
-print(pontos[3])
-print(pontos[1000])
 """Se tudo der certo, um ponto no ínicio do trajeto (índice baixo) vai ser parecido com o abaixo:
 
 
@@ -238,27 +249,12 @@ Assumindo que o vetor de pontos (i.e. `pontos`) agora contém objetos com as pro
 Como exemplo, selecionamos um intervalo que irá conter pontos que ocorrem após `tinicio` segundos e antes de  `tfim` segundos após o ínicio do percurso. Esses pontos foram escolhidos pois correspondem a um trecho de estrada que parece-se com uma reta.
 """
 
-# Escreve o arquivo cleaned_sample3.json
-with open(arquivo_pontos2, "w") as f:
-    f.write(json.dumps(pontos))
-
-
-tinicio = 3000
-tfim = 3180
-pontos_intervalo = get_points_in_time_interval(tinicio, tfim, pontos)
-print(f"Número de pontos no intervalo: {len(pontos_intervalo)}")
-print(f"Instante inicial do intervalo: {pontos_intervalo[0]['tempo_decorrido']} segundos")
-print(f"Instante final do intervalo: {pontos_intervalo[-1]['tempo_decorrido']} segundos")
-
-# Os pontos abaixos foram selecionados de forma que entre cada um deles se passam exatamente 18 segundos.
-sample_points = [pontos_intervalo[i] for i in [0, 13, 25, 38, 51, 64, 76, 89, 101, 113, 126]]
-
-print(f"Número de pontos amostrados: {len(sample_points)}")
-
 """### Visualização das amostras - O código abaixo serve para você visualizar a posição do carro em função do tempo."""
 
 
 def plot_dist_time(dist_vec, time_vec, marker='.', **kwargs):
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots(1, **kwargs)
     # fig, ax = plt.subplots(1, figsize=(16,8))
     ax.scatter(time_vec, dist_vec, marker=marker)
@@ -276,29 +272,9 @@ Para organizar melhor seu trabalho para os próximos exercícios, crie três vet
 """
 
 
-tempos = [x['tempo_decorrido'] for x in sample_points]
-distancias = [y['distancia_percorrida'] for y in sample_points]
-velocidades = [(distancias[i] - distancias[i-1])/(tempos[i] - tempos[i-1]) for i in range(1, len(sample_points))]
-
-
-velocidade_media = (distancias[-1] - distancias[0])/(tempos[-1] - tempos[0])
-
-fig, ax0 = plot_dist_time(velocidades, tempos[1:], marker='x');
-plt.hlines(velocidade_media, tempos[-1], tempos[0], colors='red', linestyle='--', label='vel. média do trecho')
-plt.legend(loc='center right')
-plt.xlabel('tempo (s)')
-plt.ylabel('velocidade  (m/s)')
-plt.show()
-
-
 """## Exercício 3. Faça agora um gráfico das velocidades médias calculadas.
 
 """
-fig, ax = plot_dist_time(distancias, tempos, marker='.')
-plt.show()
-
-
-
 """## Exercício 4. Faça o mesmo para o trajeto completo, isto é, do primeiro ponto até o último ponto do arquivo cleaned_sample3.json.
 
 Se você fez o gráfico corretamente, você verá três trechos em que a velocidade é aproximadamente constante.
@@ -309,15 +285,6 @@ Se você fez o gráfico corretamente, você verá três trechos em que a velocid
 
 
 """
-with open(arquivo_pontos2, "r") as f:
-    complete_points = f.read()
-    complete_points = json.loads(complete_points)
-
-distancias = [y['distancia_percorrida'] for y in complete_points]
-tempos = [x['tempo_decorrido'] for x in complete_points]
-velocidades = [(distancias[i] - distancias[i - 1]) / (tempos[i] - tempos[i - 1]) for i in range(1, len(complete_points))]
-fig, ax = plot_dist_time(distancias, tempos, marker='.')
-plt.show()
 
 """
 Nota-se que os trechos são: 
@@ -328,10 +295,150 @@ trecho 3 -> tempos[2794:7847]
 Os trechos do (tempos[1266] - tempos[1264]) = 381 segundos e (tempos[2794] - tempos[2792]) = 267 são momentos no qual o descolamento é praticamente nulo, 
 
 """
+"""## Exercício 7. Usando as velocidades médias calculadas no exercício 5, estabeleça uma posição inicial para cada trecho e calcule a posição do veículo para 50 pontos de acordo com o modelo de movimento uniforme e compare, medindo o erro entre a posição calculada e a posição observada do veículo. Faça um gráfico da dispersão dos erros para cada trecho. """
 
-velocidade_media_trecho1 = (distancias[1264] - distancias[0])/(tempos[1264] - tempos[0])
-print(f'velocidade no trecho 1 = {velocidade_media_trecho1} (m/s)')
 
+@etapa('arquivo_pontos')
+def pontos_com_metricas(arquivo_pontos, metodo=None):
+    """
+    Carrega os pontos de 'arquivo_pontos' e acrescenta a eles as
+    propriedades calculadas por exercicio_1.
+    """
+    pontos = carrega_pontos(arquivo_pontos)
+    exercicio_1(len(pontos), pontos, metodo)
+    return pontos
 
 
-"""## Exercício 7. Usando as velocidades médias calculadas no exercício 5, estabeleça uma posição inicial para cada trecho e calcule a posição do veículo para 50 pontos de acordo com o modelo de movimento uniforme e compare, medindo o erro entre a posição calculada e a posição observada do veículo. Faça um gráfico da dispersão dos erros para cada trecho. """
+@etapa('arquivo_pontos')
+def ajuste_dos_trechos(arquivo_pontos, min_pontos=50, grau=1):
+    """
+    Detecta os trechos em movimento dos pontos de 'arquivo_pontos' e
+    ajusta a cada um o modelo de movimento de grau 'grau'.
+    """
+    pontos = carrega_pontos(arquivo_pontos)
+    easting, northing, tempo = get_trajeto_arrays(pontos)
+    distancia = [p['distancia_percorrida'] for p in pontos]
+    trechos = detecta_trechos(easting, northing, tempo, min_pontos=min_pontos)
+    return ajusta_trechos(tempo, distancia, trechos, grau=grau)
+
+
+def _executa(cache, funcao, *args, **kwargs):
+    # Executa a etapa diretamente ou através do cache de resultados.
+    if cache is None:
+        return funcao(*args, **kwargs)
+    return cache.chama(funcao, *args, **kwargs)
+
+
+def plot_residuos(ajuste, tempos):
+    """
+    Gráfico da dispersão dos erros (observado - previsto) do 'ajuste'
+    retornado por ajusta_trechos, com uma cor para cada trecho.
+    """
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(1)
+    for i in range(len(ajuste['trechos'])):
+        no_trecho = ajuste['rotulos'] == i
+        ax.scatter(np.asarray(tempos)[ajuste['indices'][no_trecho]], ajuste['residuos'][no_trecho],
+                   marker='.', label=f'trecho {i + 1}')
+    ax.set_xlabel('tempo decorrido (s)', fontsize=14)
+    ax.set_ylabel('erro (observado - previsto) (m)', fontsize=14)
+    ax.legend()
+    return fig, ax
+
+
+def main(arquivo_pontos=ARQUIVO_PONTOS, arquivo_pontos2=ARQUIVO_PONTOS2, tinicio=TINICIO, tfim=TFIM,
+         diretorio_cache=None):
+    """
+    Executa os exercícios. Se 'diretorio_cache' for dado, as etapas
+    pontos_com_metricas e ajuste_dos_trechos são guardadas num
+    CacheResultados nesse diretório e só são recalculadas quando os
+    arquivos de entrada ou os parâmetros mudam.
+    """
+    import matplotlib.pyplot as plt
+
+    # para ignorar todos os warnings
+    warnings.filterwarnings('ignore')
+
+    cache = CacheResultados(diretorio_cache) if diretorio_cache else None
+
+    # Vamos carregar os pontos (do JSON filtrado) na variável pontos
+    # e calcular as distâncias e tempos do exercício 1.
+    pontos = _executa(cache, pontos_com_metricas, arquivo_pontos)
+
+    # Dica, para pegar e calcular a diferença de tempo entre dois pontos você pode usar a função get_shot_time:
+    tdelta = get_shot_time(1, pontos)-get_shot_time(0, pontos)
+    print(f"A diferença entre dois objetos 'datetime' gera um objeto 'timedelta': {type(tdelta)}")
+    print(f"Exemplo do objeto 'timedelta': {tdelta}")
+    print(f'Segundos decorridos: {tdelta.seconds}')
+
+    print(pontos[3])
+    print(pontos[1000])
+
+    # Escreve o arquivo cleaned_sample3.json (só se o conteúdo mudou, para
+    # não invalidar à toa as etapas que dependem dele no cache).
+    conteudo = json.dumps(pontos)
+    try:
+        with open(arquivo_pontos2, "r") as f:
+            mudou = f.read() != conteudo
+    except FileNotFoundError:
+        mudou = True
+    if mudou:
+        with open(arquivo_pontos2, "w") as f:
+            f.write(conteudo)
+
+    pontos_intervalo = get_points_in_time_interval(tinicio, tfim, pontos)
+    print(f"Número de pontos no intervalo: {len(pontos_intervalo)}")
+    print(f"Instante inicial do intervalo: {pontos_intervalo[0]['tempo_decorrido']} segundos")
+    print(f"Instante final do intervalo: {pontos_intervalo[-1]['tempo_decorrido']} segundos")
+
+    # Os pontos abaixos foram selecionados de forma que entre cada um deles se passam exatamente 18 segundos.
+    sample_points = [pontos_intervalo[i] for i in [0, 13, 25, 38, 51, 64, 76, 89, 101, 113, 126]]
+
+    print(f"Número de pontos amostrados: {len(sample_points)}")
+
+    # Exercício 2
+    tempos = [x['tempo_decorrido'] for x in sample_points]
+    distancias = [y['distancia_percorrida'] for y in sample_points]
+    velocidades = [(distancias[i] - distancias[i-1])/(tempos[i] - tempos[i-1]) for i in range(1, len(sample_points))]
+
+    velocidade_media = (distancias[-1] - distancias[0])/(tempos[-1] - tempos[0])
+
+    fig, ax0 = plot_dist_time(velocidades, tempos[1:], marker='x');
+    plt.hlines(velocidade_media, tempos[-1], tempos[0], colors='red', linestyle='--', label='vel. média do trecho')
+    plt.legend(loc='center right')
+    plt.xlabel('tempo (s)')
+    plt.ylabel('velocidade  (m/s)')
+    plt.show()
+
+    # Exercício 3
+    fig, ax = plot_dist_time(distancias, tempos, marker='.')
+    plt.show()
+
+    # Exercícios 4, 5 e 6
+    complete_points = carrega_pontos(arquivo_pontos2)
+
+    distancias = [y['distancia_percorrida'] for y in complete_points]
+    tempos = [x['tempo_decorrido'] for x in complete_points]
+    velocidades = [(distancias[i] - distancias[i - 1]) / (tempos[i] - tempos[i - 1]) for i in range(1, len(complete_points))]
+    fig, ax = plot_dist_time(distancias, tempos, marker='.')
+    plt.show()
+
+    velocidade_media_trecho1 = (distancias[1264] - distancias[0])/(tempos[1264] - tempos[0])
+    print(f'velocidade no trecho 1 = {velocidade_media_trecho1} (m/s)')
+
+    # Exercício 7
+    ajuste = _executa(cache, ajuste_dos_trechos, arquivo_pontos2, min_pontos=50, grau=1)
+
+    for i, (inicio, fim) in enumerate(ajuste['trechos']):
+        print(f"trecho {i + 1} ({inicio} a {fim}): v = {ajuste['v'][i]} (m/s); rmse = {ajuste['rmse'][i]} (m)")
+
+    plot_residuos(ajuste, tempos)
+    plt.show()
+
+    if cache is not None:
+        print(cache.relatorio())
+
+
+if __name__ == "__main__":
+    main(diretorio_cache=".cache_resultados")
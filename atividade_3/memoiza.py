@@ -0,0 +1,195 @@
+"""
+Cache em disco dos resultados das etapas de análise.
+
+Executar mac0209_ex3.py de novo refaz tudo (leitura do JSON,
+exercicio_1, seleção de intervalos, velocidades), mesmo quando nem os
+arquivos de entrada nem os parâmetros mudaram. CacheResultados guarda
+o resultado de cada chamada de uma etapa num arquivo identificado pelo
+hash de:
+
+- o nome e o código-fonte da função;
+- o conteúdo (sha256) dos arquivos de entrada da chamada;
+- os demais argumentos (vetores numpy pelo dtype, formato e conteúdo;
+  outros valores só se tiverem uma representação estável, ver
+  digest_valor).
+
+Na próxima chamada com as mesmas entradas o resultado é lido do disco.
+Só o código da própria etapa entra na chave: se uma função chamada por
+ela (e.g. modelos.ajusta_trechos) mudar, apague o diretório do cache.
+Quando o tamanho total do cache passa de 'tamanho_max' bytes, os
+resultados usados há mais tempo são removidos (LRU). As contagens de
+acertos e faltas ficam em 'acertos' e 'faltas' (ver relatorio).
+
+As etapas indicam quais argumentos são caminhos de arquivos com o
+decorador etapa:
+
+    @etapa('arquivo_pontos')
+    def pontos_com_metricas(arquivo_pontos, metodo=None):
+        ...
+
+    cache = CacheResultados('.cache_resultados')
+    pontos = cache.chama(pontos_com_metricas, 'cleaned_sample2.json')
+"""
+
+import hashlib
+import inspect
+import os
+import pickle
+
+import numpy as np
+
+DIRETORIO_CACHE = ".cache_resultados"
+TAMANHO_MAX = 512 * 2 ** 20  # 512 MiB
+
+
+def etapa(*arquivos):
+    """
+    Decorador que marca os parâmetros 'arquivos' da função como
+    caminhos de arquivos de entrada, cujo conteúdo entra na chave do cache.
+    """
+    def marca(funcao):
+        funcao.arquivos_de_entrada = arquivos
+        return funcao
+    return marca
+
+
+def digest_funcao(funcao):
+    """sha256 (hex) do nome qualificado e do código-fonte de 'funcao'."""
+    digest = hashlib.sha256(f"{funcao.__module__}.{funcao.__qualname__}".encode())
+    try:
+        digest.update(inspect.getsource(funcao).encode())
+    except (OSError, TypeError):
+        # Função sem código-fonte disponível (e.g. definida no interpretador).
+        digest.update(funcao.__code__.co_code)
+    return digest.hexdigest()
+
+
+# Tipos cujo repr identifica o valor sem ambiguidade.
+_TIPOS_SIMPLES = (type(None), bool, int, float, complex, str, bytes)
+
+
+def digest_valor(digest, valor):
+    """
+    Acrescenta 'valor' ao 'digest' (hashlib). Aceita vetores numpy,
+    escalares, strings, bytes, None e tuplas, listas e dicionários
+    desses valores; qualquer outro tipo levanta TypeError, pois o seu
+    repr pode não distinguir valores diferentes (o repr de vetores numpy
+    grandes, por exemplo, é abreviado com '...').
+    """
+    if isinstance(valor, (np.ndarray, np.generic)):
+        valor = np.asarray(valor)
+        if valor.dtype.hasobject:
+            raise TypeError("Vetores numpy de objetos não podem entrar na chave do cache.")
+        digest.update(f"ndarray{valor.dtype.str}{valor.shape}".encode())
+        digest.update(np.ascontiguousarray(valor).tobytes())
+    elif isinstance(valor, _TIPOS_SIMPLES):
+        digest.update(f"{type(valor).__name__}:{valor!r}".encode())
+    elif isinstance(valor, (tuple, list)):
+        digest.update(f"{type(valor).__name__}{len(valor)}".encode())
+        for item in valor:
+            digest_valor(digest, item)
+    elif isinstance(valor, dict):
+        digest.update(f"dict{len(valor)}".encode())
+        for chave in sorted(valor, key=repr):
+            digest_valor(digest, chave)
+            digest_valor(digest, valor[chave])
+    else:
+        raise TypeError(f"Valor do tipo {type(valor).__name__} não tem uma representação "
+                        "estável para a chave do cache.")
+
+
+class CacheResultados:
+    """Cache LRU em disco de resultados de etapas, limitado a 'tamanho_max' bytes."""
+
+    def __init__(self, diretorio=DIRETORIO_CACHE, tamanho_max=TAMANHO_MAX):
+        self.diretorio = diretorio
+        self.tamanho_max = tamanho_max
+        self.acertos = 0
+        self.faltas = 0
+        self.por_etapa = {}
+        # (caminho, tamanho, mtime) -> sha256, para não reler arquivos inalterados.
+        self._digests = {}
+        os.makedirs(diretorio, exist_ok=True)
+
+    def digest_arquivo(self, caminho):
+        """sha256 do conteúdo do arquivo 'caminho'."""
+        info = os.stat(caminho)
+        chave = (os.path.abspath(caminho), info.st_size, info.st_mtime_ns)
+        if chave not in self._digests:
+            digest = hashlib.sha256()
+            with open(caminho, "rb") as f:
+                for parte in iter(lambda: f.read(2 ** 20), b""):
+                    digest.update(parte)
+            self._digests[chave] = digest.hexdigest()
+        return self._digests[chave]
+
+    def chave(self, funcao, *args, **kwargs):
+        """Chave (hex) da chamada funcao(*args, **kwargs)."""
+        argumentos = inspect.signature(funcao).bind(*args, **kwargs)
+        argumentos.apply_defaults()
+        arquivos = getattr(funcao, 'arquivos_de_entrada', ())
+
+        digest = hashlib.sha256(digest_funcao(funcao).encode())
+        for nome, valor in argumentos.arguments.items():
+            digest.update(nome.encode())
+            if nome in arquivos:
+                digest.update(self.digest_arquivo(valor).encode())
+            else:
+                try:
+                    digest_valor(digest, valor)
+                except TypeError as e:
+                    raise TypeError(f"Argumento {nome!r} de {funcao.__qualname__}: {e}") from None
+        return digest.hexdigest()
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, f"{chave}.pkl")
+
+    def chama(self, funcao, *args, **kwargs):
+        """
+        Retorna funcao(*args, **kwargs), lendo o resultado do cache se
+        a mesma chamada (com as mesmas entradas) já foi feita.
+        """
+        caminho = self._caminho(self.chave(funcao, *args, **kwargs))
+        contagem = self.por_etapa.setdefault(funcao.__qualname__, [0, 0])
+        try:
+            with open(caminho, "rb") as f:
+                resultado = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            pass
+        else:
+            os.utime(caminho)  # marca como usado recentemente
+            self.acertos += 1
+            contagem[0] += 1
+            return resultado
+
+        self.faltas += 1
+        contagem[1] += 1
+        resultado = funcao(*args, **kwargs)
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        with open(temporario, "wb") as f:
+            pickle.dump(resultado, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, caminho)
+        self.remove_excedente()
+        return resultado
+
+    def remove_excedente(self):
+        """Remove os resultados menos usados até o cache caber em 'tamanho_max'."""
+        entradas = []
+        for nome in os.listdir(self.diretorio):
+            if not nome.endswith(".pkl"):
+                continue
+            info = os.stat(os.path.join(self.diretorio, nome))
+            entradas.append((info.st_mtime, info.st_size, nome))
+        total = sum(tamanho for _, tamanho, _ in entradas)
+        for _, tamanho, nome in sorted(entradas):
+            if total <= self.tamanho_max:
+                break
+            os.remove(os.path.join(self.diretorio, nome))
+            total -= tamanho
+
+    def relatorio(self):
+        """Texto com os acertos e faltas de cada etapa."""
+        linhas = [f"cache de resultados: {self.acertos} acertos, {self.faltas} faltas"]
+        for nome, (acertos, faltas) in self.por_etapa.items():
+            linhas.append(f"  {nome}: {acertos} acertos, {faltas} faltas")
+        return "\n".join(linhas)
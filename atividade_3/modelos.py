@@ -0,0 +1,146 @@
+"""
+Ajuste de modelos de movimento por trecho e análise dos resíduos.
+
+Para cada trecho (inicio, fim) do trajeto, ajusta por mínimos quadrados
+o modelo de movimento uniforme
+
+    x(t) = x0 + v * (t - t0)
+
+ou, com grau=2, o de movimento uniformemente acelerado
+
+    x(t) = x0 + v * (t - t0) + a * (t - t0)^2 / 2
+
+em que t0 é o instante do primeiro ponto do trecho. Todos os trechos
+são ajustados de uma vez: as equações normais de cada trecho são
+montadas com np.bincount e resolvidas em lote com np.linalg.solve.
+Trechos com menos instantes distintos que parâmetros do modelo não têm
+ajuste único e recebem parâmetros nan, sem impedir o ajuste dos demais.
+"""
+
+import numpy as np
+
+PARAMETROS = ('x0', 'v', 'a')
+
+
+def _indices_trechos(trechos):
+    # Retorna os índices de todos os pontos dos trechos e, para cada
+    # um deles, o número do trecho ao qual pertence.
+    trechos = np.asarray(trechos, dtype=int).reshape(-1, 2)
+    tamanhos = trechos[:, 1] - trechos[:, 0] + 1
+    rotulos = np.repeat(np.arange(len(trechos)), tamanhos)
+    deslocamento = np.arange(len(rotulos)) - np.repeat(np.cumsum(tamanhos) - tamanhos, tamanhos)
+    indices = trechos[rotulos, 0] + deslocamento
+    return trechos, tamanhos, indices, rotulos
+
+
+def _vandermonde(tau, grau):
+    return tau[:, None] ** np.arange(grau + 1)
+
+
+def ajusta_trechos(tempo, distancia, trechos, grau=1):
+    """
+    Ajusta o modelo de movimento de grau 'grau' (1: uniforme,
+    2: uniformemente acelerado) a cada trecho de 'trechos', uma
+    sequência de pares (inicio, fim) de índices inclusivos nos vetores
+    'tempo' e 'distancia' (e.g. o resultado de detecta_trechos).
+
+    Retorna um dicionário com:
+    - 'trechos': os pares (inicio, fim) como vetor (k, 2);
+    - 't0' e 't1': os instantes inicial e final de cada trecho;
+    - 'x0', 'v' e, se grau=2, 'a': os parâmetros de cada trecho;
+    - 'coeficientes': o vetor (k, grau + 1) do polinômio em (t - t0);
+    - 'indices', 'rotulos', 'predicao', 'residuos': para cada ponto usado
+      no ajuste, seu índice, seu trecho, a posição prevista e o erro
+      (observado - previsto);
+    - 'rmse', 'erro_medio', 'erro_max': estatísticas dos resíduos por trecho.
+
+    Os trechos com menos de grau + 1 instantes distintos têm todos os
+    parâmetros, previsões e estatísticas iguais a nan.
+    """
+    if grau not in (1, 2):
+        raise ValueError(f"Grau do modelo deve ser 1 ou 2, não {grau!r}.")
+    tempo = np.asarray(tempo, dtype=float)
+    distancia = np.asarray(distancia, dtype=float)
+    trechos, tamanhos, indices, rotulos = _indices_trechos(trechos)
+    k = len(trechos)
+    p = grau + 1
+
+    t0 = tempo[trechos[:, 0]]
+    tau = tempo[indices] - t0[rotulos]
+    x = distancia[indices]
+    V = _vandermonde(tau, grau)
+
+    # Instantes distintos de cada trecho (os tempos de um trecho são crescentes).
+    novos = np.concatenate(([True], (np.diff(tau) != 0) | (np.diff(rotulos) != 0)))
+    validos = np.bincount(rotulos, weights=novos, minlength=k) >= p
+
+    # Equações normais (V^T V) c = V^T x de cada trecho.
+    A = np.empty((k, p, p))
+    b = np.empty((k, p))
+    for i in range(p):
+        b[:, i] = np.bincount(rotulos, weights=V[:, i] * x, minlength=k)
+        for j in range(i, p):
+            A[:, i, j] = A[:, j, i] = np.bincount(rotulos, weights=V[:, i] * V[:, j], minlength=k)
+    coeficientes = np.full((k, p), np.nan)
+    coeficientes[validos] = np.linalg.solve(A[validos], b[validos, :, None])[..., 0]
+
+    predicao = np.sum(V * coeficientes[rotulos], axis=1)
+    residuos = x - predicao
+    inicios = np.cumsum(tamanhos) - tamanhos
+
+    ajuste = {
+        'grau': grau,
+        'trechos': trechos,
+        't0': t0,
+        't1': tempo[trechos[:, 1]],
+        'coeficientes': coeficientes,
+        'x0': coeficientes[:, 0],
+        'v': coeficientes[:, 1],
+        'indices': indices,
+        'rotulos': rotulos,
+        'predicao': predicao,
+        'residuos': residuos,
+        'rmse': np.sqrt(np.bincount(rotulos, weights=residuos ** 2, minlength=k) / tamanhos),
+        'erro_medio': np.bincount(rotulos, weights=residuos, minlength=k) / tamanhos,
+        'erro_max': np.maximum.reduceat(np.abs(residuos), inicios),
+    }
+    if grau == 2:
+        ajuste['a'] = 2 * coeficientes[:, 2]
+    return ajuste
+
+
+def trecho_do_instante(ajuste, tempos):
+    """
+    Retorna, para cada instante em 'tempos', o número do trecho ajustado
+    que o contém (entre 't0' e 't1' do trecho, inclusive), ou -1 se o
+    instante não está em nenhum trecho (antes do primeiro, depois do
+    último ou numa parada entre dois trechos).
+    """
+    tempos = np.asarray(tempos, dtype=float)
+    trecho = np.searchsorted(ajuste['t0'], tempos, side='right') - 1
+    dentro = (trecho >= 0) & (tempos <= ajuste['t1'][np.maximum(trecho, 0)])
+    return np.where(dentro, trecho, -1)
+
+
+def prediz(ajuste, tempos, trecho=None):
+    """
+    Retorna a posição prevista pelo modelo nos instantes 'tempos'.
+
+    'trecho' indica qual trecho ajustado usar para cada instante (um
+    inteiro ou um vetor do mesmo tamanho de 'tempos'); se omitido, o
+    trecho é escolhido por trecho_do_instante. Instantes com trecho -1
+    (fora de todos os trechos) recebem nan.
+    """
+    tempos = np.asarray(tempos, dtype=float)
+    if trecho is None:
+        trecho = trecho_do_instante(ajuste, tempos)
+    trecho = np.broadcast_to(np.asarray(trecho, dtype=int), tempos.shape)
+    fora = trecho < 0
+    trecho = np.where(fora, 0, trecho)
+    tau = tempos - ajuste['t0'][trecho]
+    coeficientes = ajuste['coeficientes'][trecho]
+    # Avalia o polinômio pelo método de Horner.
+    x = coeficientes[..., -1]
+    for i in range(ajuste['grau'] - 1, -1, -1):
+        x = x * tau + coeficientes[..., i]
+    return np.where(fora, np.nan, x)
@@ -0,0 +1,150 @@
+"""
+Armazenamento em ladrilhos (tiles) de pontos de várias viagens.
+
+Cada viagem é um arquivo `cleaned_sampleN.json` independente, de modo
+que perguntar "quais fotos foram tiradas nesta região e neste intervalo
+de tempo" exigiria abrir todas as viagens. Aqui os pontos de todas as
+viagens são particionados por dia (`shot_date`) e por uma grade regular
+sobre `easting`/`northing`:
+
+    <diretorio>/<AAAA-MM-DD>/<coluna>_<linha>.bin
+
+Cada arquivo é um vetor binário de registros (ver DTYPE_PONTO) ao qual
+novos pontos são apenas acrescentados no fim. Uma consulta lê somente
+os ladrilhos que intersectam a região e os dias pedidos, com np.memmap,
+de forma que o custo cresce com o tamanho do resultado e não com o
+número de viagens guardadas.
+"""
+
+import os
+
+import numpy as np
+
+DTYPE_PONTO = np.dtype([
+    ('viagem', '<i4'),
+    ('indice', '<i4'),
+    ('easting', '<f8'),
+    ('northing', '<f8'),
+    ('shot_date', '<i8'),  # segundos desde 1970-01-01 (UTC)
+])
+
+TAMANHO_LADRILHO = 1000.0  # metros
+
+
+def _segundos(data):
+    # Converte uma data (string '%Y-%m-%d %H:%M:%S', datetime ou
+    # datetime64) em segundos desde 1970-01-01.
+    return np.asarray(data, dtype='datetime64[s]').astype(np.int64)
+
+
+class MosaicoTrajetos:
+    """
+    Conjunto de ladrilhos guardados no 'diretorio', com ladrilhos
+    quadrados de lado 'tamanho' metros.
+    """
+
+    def __init__(self, diretorio, tamanho=TAMANHO_LADRILHO):
+        self.diretorio = diretorio
+        self.tamanho = float(tamanho)
+        os.makedirs(diretorio, exist_ok=True)
+
+    def _caminho(self, dia, coluna, linha):
+        return os.path.join(self.diretorio, dia, f"{coluna}_{linha}.bin")
+
+    def adiciona(self, viagem, easting, northing, shot_date, inicio=0):
+        """
+        Acrescenta os pontos de uma viagem (identificada pelo inteiro
+        'viagem') dados como vetores de mesmo tamanho. 'shot_date' pode
+        ser um vetor de strings '%Y-%m-%d %H:%M:%S' ou de datetime64.
+
+        Os pontos recebem os índices inicio, inicio + 1, ...; ao
+        acrescentar uma viagem em várias chamadas, passe em 'inicio' o
+        número de pontos dela já acrescentados.
+        """
+        easting = np.asarray(easting, dtype=float)
+        northing = np.asarray(northing, dtype=float)
+        segundos = _segundos(shot_date)
+
+        registros = np.empty(len(easting), dtype=DTYPE_PONTO)
+        registros['viagem'] = viagem
+        registros['indice'] = inicio + np.arange(len(easting))
+        registros['easting'] = easting
+        registros['northing'] = northing
+        registros['shot_date'] = segundos
+
+        colunas = np.floor(easting / self.tamanho).astype(np.int64)
+        linhas = np.floor(northing / self.tamanho).astype(np.int64)
+        dias = segundos // 86400
+
+        # Agrupa os registros por ladrilho com uma única ordenação.
+        chaves = np.column_stack((dias, colunas, linhas))
+        unicas, grupo = np.unique(chaves, axis=0, return_inverse=True)
+        grupo = grupo.ravel()
+        ordem = np.argsort(grupo, kind='stable')
+        limites = np.searchsorted(grupo[ordem], np.arange(len(unicas) + 1))
+
+        for k, (dia, coluna, linha) in enumerate(unicas):
+            nome_dia = str(np.datetime64(int(dia), 'D'))
+            caminho = self._caminho(nome_dia, coluna, linha)
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            with open(caminho, "ab") as f:
+                registros[ordem[limites[k]:limites[k + 1]]].tofile(f)
+
+    def adiciona_pontos(self, viagem, points_object, inicio=0):
+        """
+        Acrescenta os pontos da lista "points_object" (com as
+        propriedades `easting`, `northing` e `shot_date`); 'inicio'
+        é como em adiciona.
+        """
+        self.adiciona(
+            viagem,
+            [p['easting'] for p in points_object],
+            [p['northing'] for p in points_object],
+            [p['shot_date'] for p in points_object],
+            inicio,
+        )
+
+    def _ladrilhos(self, emin, nmin, emax, nmax, inicio, fim):
+        # Caminhos dos ladrilhos existentes que intersectam a região e os dias.
+        cmin, cmax = int(np.floor(emin / self.tamanho)), int(np.floor(emax / self.tamanho))
+        lmin, lmax = int(np.floor(nmin / self.tamanho)), int(np.floor(nmax / self.tamanho))
+        caminhos = []
+        for dia in np.arange(inicio // 86400, fim // 86400 + 1):
+            nome_dia = str(np.datetime64(int(dia), 'D'))
+            diretorio_dia = os.path.join(self.diretorio, nome_dia)
+            if not os.path.isdir(diretorio_dia):
+                continue
+            if (cmax - cmin + 1) * (lmax - lmin + 1) <= 64:
+                candidatos = [self._caminho(nome_dia, coluna, linha)
+                              for coluna in range(cmin, cmax + 1)
+                              for linha in range(lmin, lmax + 1)]
+                caminhos.extend(c for c in candidatos if os.path.exists(c))
+                continue
+            for nome in os.listdir(diretorio_dia):
+                if not nome.endswith(".bin"):
+                    continue
+                coluna, linha = map(int, nome[:-len(".bin")].split("_"))
+                if cmin <= coluna <= cmax and lmin <= linha <= lmax:
+                    caminhos.append(os.path.join(diretorio_dia, nome))
+        return caminhos
+
+    def consulta(self, emin, nmin, emax, nmax, inicio, fim):
+        """
+        Retorna um vetor de registros (DTYPE_PONTO) com todos os pontos
+        dentro do retângulo [emin, emax] x [nmin, nmax] (em metros) e
+        tirados entre as datas 'inicio' e 'fim' (inclusive).
+        """
+        inicio = int(_segundos(inicio))
+        fim = int(_segundos(fim))
+        partes = []
+        for caminho in self._ladrilhos(emin, nmin, emax, nmax, inicio, fim):
+            if os.path.getsize(caminho) == 0:
+                continue
+            ladrilho = np.memmap(caminho, dtype=DTYPE_PONTO, mode='r')
+            dentro = ((ladrilho['easting'] >= emin) & (ladrilho['easting'] <= emax)
+                      & (ladrilho['northing'] >= nmin) & (ladrilho['northing'] <= nmax)
+                      & (ladrilho['shot_date'] >= inicio) & (ladrilho['shot_date'] <= fim))
+            partes.append(np.array(ladrilho[dentro]))
+        if not partes:
+            return np.empty(0, dtype=DTYPE_PONTO)
+        return np.concatenate(partes)
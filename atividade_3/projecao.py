@@ -0,0 +1,103 @@
+"""
+Reprojeção vetorizada (e opcionalmente paralela) de coordenadas.
+
+get_point_coords_proj reprojeta um ponto por vez e cria dois objetos
+Proj a cada chamada. Aqui a reprojeção de EPSG:4326 para EPSG:3857 (ou
+entre quaisquer outros CRS) é feita sobre vetores inteiros com um único
+pyproj.Transformer.
+
+Para dezenas de milhões de pontos, projeta_paralelo divide os vetores
+em blocos e distribui os blocos num conjunto de processos. Entradas e
+saídas ficam em memória compartilhada (multiprocessing.shared_memory),
+então os processos não precisam serializar os dados: cada um recebe só
+o nome da memória e o intervalo do seu bloco. Como cada bloco passa
+pelo mesmo Transformer usado em projeta, o resultado é idêntico ao da
+versão sequencial.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+ORIGEM = 'epsg:4326'
+DESTINO = 'epsg:3857'
+
+_transformers = {}
+
+
+def _transformer(origem, destino):
+    # Um Transformer por processo e por par de CRS.
+    chave = (origem, destino)
+    if chave not in _transformers:
+        from pyproj import Transformer
+
+        _transformers[chave] = Transformer.from_crs(origem, destino, always_xy=True)
+    return _transformers[chave]
+
+
+def projeta(lng, lat, origem=ORIGEM, destino=DESTINO):
+    """
+    Reprojeta os vetores 'lng' e 'lat' (em graus) e retorna os
+    vetores (easting, northing) na projeção 'destino'.
+    """
+    x, y = _transformer(origem, destino).transform(np.asarray(lng, dtype=float),
+                                                   np.asarray(lat, dtype=float))
+    return np.asarray(x), np.asarray(y)
+
+
+def _projeta_bloco(nome_entrada, nome_saida, n, inicio, fim, origem, destino):
+    entrada = shared_memory.SharedMemory(name=nome_entrada)
+    saida = shared_memory.SharedMemory(name=nome_saida)
+    try:
+        coords = np.ndarray((2, n), dtype=np.float64, buffer=entrada.buf)
+        projetadas = np.ndarray((2, n), dtype=np.float64, buffer=saida.buf)
+        x, y = projeta(coords[0, inicio:fim], coords[1, inicio:fim], origem, destino)
+        projetadas[0, inicio:fim] = x
+        projetadas[1, inicio:fim] = y
+        del coords, projetadas
+    finally:
+        entrada.close()
+        saida.close()
+
+
+def projeta_paralelo(lng, lat, origem=ORIGEM, destino=DESTINO, processos=None, tamanho_bloco=None):
+    """
+    Igual a projeta, mas divide o trabalho entre 'processos' processos
+    (por padrão, o número de CPUs) em blocos de 'tamanho_bloco' pontos
+    (por padrão, quatro blocos por processo).
+    """
+    lng = np.asarray(lng, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    n = len(lng)
+    if processos is None:
+        processos = os.cpu_count() or 1
+    if processos <= 1 or n == 0:
+        return projeta(lng, lat, origem, destino)
+    if tamanho_bloco is None:
+        tamanho_bloco = max(1, -(-n // (4 * processos)))
+
+    bytes_ = 2 * n * np.dtype(np.float64).itemsize
+    entrada = shared_memory.SharedMemory(create=True, size=bytes_)
+    saida = shared_memory.SharedMemory(create=True, size=bytes_)
+    try:
+        coords = np.ndarray((2, n), dtype=np.float64, buffer=entrada.buf)
+        coords[0] = lng
+        coords[1] = lat
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            tarefas = [executor.submit(_projeta_bloco, entrada.name, saida.name, n,
+                                       inicio, min(inicio + tamanho_bloco, n), origem, destino)
+                       for inicio in range(0, n, tamanho_bloco)]
+            for tarefa in tarefas:
+                tarefa.result()
+        projetadas = np.ndarray((2, n), dtype=np.float64, buffer=saida.buf)
+        x = projetadas[0].copy()
+        y = projetadas[1].copy()
+        del coords, projetadas
+    finally:
+        entrada.close()
+        entrada.unlink()
+        saida.close()
+        saida.unlink()
+    return x, y
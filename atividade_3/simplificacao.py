@@ -0,0 +1,202 @@
+"""
+Simplificação e reamostragem de trajetos.
+
+O KartaView registra fotos a cada poucos metros, mas para gráficos,
+ajuste de modelos e armazenamento bastam bem menos pontos. As funções
+abaixo trabalham diretamente com os vetores numpy de `easting`,
+`northing` e `tempo_decorrido` (como os de `cleaned_sample3.json`) e
+retornam os índices ou os novos vetores do trajeto simplificado.
+
+Todos os métodos aceitam 'fixos', índices de pontos que são sempre
+mantidos. Passando os extremos das paradas e lacunas (o resultado de
+detecta_paradas), os trechos detectados no trajeto original continuam
+separados no simplificado; sem 'fixos' (o padrão) as paradas não são
+tratadas de forma especial.
+"""
+
+import numpy as np
+
+
+def get_trajeto_arrays(points_object):
+    """
+    Retorna os vetores numpy (easting, northing, tempo) a partir da
+    lista de pontos "points_object" (com as propriedades `easting`,
+    `northing` e `tempo_decorrido`).
+    """
+    easting = np.array([p['easting'] for p in points_object], dtype=float)
+    northing = np.array([p['northing'] for p in points_object], dtype=float)
+    tempo = np.array([p['tempo_decorrido'] for p in points_object], dtype=float)
+    return easting, northing, tempo
+
+
+def _passos_em_movimento(easting, northing, tempo, vel_min, lacuna_max):
+    # True em cada passo (i, i+1) com velocidade de pelo menos 'vel_min'
+    # e intervalo de tempo de no máximo 'lacuna_max'. Passos entre fotos
+    # do mesmo segundo não têm velocidade: só contam como movimento se os
+    # passos mais próximos com intervalo, antes e depois, forem movimento.
+    dt = np.diff(tempo)
+    ds = np.hypot(np.diff(easting), np.diff(northing))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vel = ds / dt
+    movimento = ~((vel < vel_min) | (dt > lacuna_max))
+    mesmo_instante = dt <= 0
+    if np.any(mesmo_instante):
+        m = len(dt)
+        posicoes = np.arange(m)
+        anterior = np.maximum.accumulate(np.where(mesmo_instante, -1, posicoes))
+        posterior = np.minimum.accumulate(np.where(mesmo_instante, m, posicoes)[::-1])[::-1]
+        vizinhos = ((anterior >= 0) & (posterior < m)
+                    & movimento[np.maximum(anterior, 0)] & movimento[np.minimum(posterior, m - 1)])
+        movimento = np.where(mesmo_instante, vizinhos, movimento)
+    return movimento
+
+
+def _sequencias(mascara):
+    # Índices (inicio, fim) dos pontos que delimitam cada sequência de
+    # passos consecutivos com 'mascara' verdadeira.
+    borda = np.diff(np.concatenate(([0], mascara.astype(np.int8), [0])))
+    return np.flatnonzero(borda == 1), np.flatnonzero(borda == -1)
+
+
+def detecta_paradas(easting, northing, tempo, vel_min=0.5, lacuna_max=60):
+    """
+    Retorna os índices (ordenados) dos pontos que delimitam paradas:
+    extremos de passos com velocidade menor que 'vel_min' (m/s) ou com
+    intervalo de tempo maior que 'lacuna_max' (s). O primeiro e o último
+    ponto do trajeto sempre fazem parte do resultado.
+    """
+    n = len(easting)
+    if n < 2:
+        return np.arange(n)
+    parada = ~_passos_em_movimento(easting, northing, tempo, vel_min, lacuna_max)
+    inicios, fins = _sequencias(parada)
+    return np.unique(np.concatenate(([0, n - 1], inicios, fins)))
+
+
+def detecta_trechos(easting, northing, tempo, vel_min=0.5, lacuna_max=60, min_pontos=2):
+    """
+    Retorna uma lista de pares (inicio, fim), com índices inclusivos,
+    dos trechos em que o veículo está em movimento, isto é, os trechos
+    entre as paradas e lacunas encontradas por detecta_paradas.
+    Trechos com menos de 'min_pontos' pontos são descartados.
+    """
+    n = len(easting)
+    if n < 2:
+        return []
+    movimento = _passos_em_movimento(easting, northing, tempo, vel_min, lacuna_max)
+    inicios, fins = _sequencias(movimento)
+    return [(int(i), int(f)) for i, f in zip(inicios, fins) if f - i + 1 >= min_pontos]
+
+
+def _distancia_ao_segmento(x, y, x0, y0, x1, y1):
+    # Distância de cada ponto (x, y) ao segmento (x0, y0)-(x1, y1).
+    dx = x1 - x0
+    dy = y1 - y0
+    comprimento2 = dx * dx + dy * dy
+    if comprimento2 == 0:
+        return np.hypot(x - x0, y - y0)
+    u = np.clip(((x - x0) * dx + (y - y0) * dy) / comprimento2, 0, 1)
+    return np.hypot(x - (x0 + u * dx), y - (y0 + u * dy))
+
+
+def douglas_peucker(easting, northing, tolerancia, fixos=None):
+    """
+    Simplifica o trajeto pelo algoritmo de Douglas-Peucker, garantindo
+    que nenhum ponto removido fique a mais de 'tolerancia' metros do
+    trajeto simplificado.
+
+    'fixos' é uma sequência opcional de índices que devem ser mantidos
+    (e.g. o resultado de detecta_paradas). Retorna os índices mantidos.
+
+    A recursão é feita com uma pilha explícita e a distância de cada
+    ponto ao segmento é calculada de forma vetorizada, de modo que
+    trajetos com milhões de pontos não esbarram no limite de recursão.
+    """
+    x = np.asarray(easting, dtype=float)
+    y = np.asarray(northing, dtype=float)
+    n = len(x)
+    if n < 3:
+        return np.arange(n)
+
+    manter = np.zeros(n, dtype=bool)
+    ancoras = [0, n - 1]
+    if fixos is not None:
+        ancoras = np.concatenate((ancoras, np.asarray(fixos, dtype=int)))
+    ancoras = np.unique(ancoras)
+    manter[ancoras] = True
+
+    pilha = list(zip(ancoras[:-1], ancoras[1:]))
+    while pilha:
+        i, j = pilha.pop()
+        if j - i < 2:
+            continue
+        d = _distancia_ao_segmento(x[i + 1:j], y[i + 1:j], x[i], y[i], x[j], y[j])
+        k = int(np.argmax(d))
+        if d[k] > tolerancia:
+            m = i + 1 + k
+            manter[m] = True
+            pilha.append((i, m))
+            pilha.append((m, j))
+    return np.flatnonzero(manter)
+
+
+def _reamostra(eixo, passo, fixos, *valores):
+    # Reamostra os 'valores' em posições regulares de 'eixo' (tempo ou
+    # distância acumulada), reiniciando a grade em cada ponto fixo.
+    # Os pontos fixos são copiados como estão e só o interior de cada
+    # trecho (eixo[i], eixo[j]) entre dois fixos é interpolado. Assim dois
+    # fixos com o mesmo valor de 'eixo' (e.g. os extremos de uma parada
+    # na distância acumulada) continuam sendo dois pontos distintos.
+    n = len(eixo)
+    if n == 0:
+        return (eixo,) + valores
+    ancoras = [0, n - 1]
+    if fixos is not None:
+        ancoras = np.concatenate((ancoras, np.asarray(fixos, dtype=int)))
+    ancoras = np.unique(ancoras)
+
+    novo_eixo = []
+    novos_valores = [[] for _ in valores]
+    for i, j in zip(ancoras[:-1], ancoras[1:]):
+        grade = np.arange(eixo[i], eixo[j], passo)[1:]
+        grade = grade[grade < eixo[j]]
+        novo_eixo.append(eixo[i:i + 1])
+        novo_eixo.append(grade)
+        for novo, v in zip(novos_valores, valores):
+            novo.append(v[i:i + 1])
+            novo.append(np.interp(grade, eixo[i:j + 1], v[i:j + 1]))
+    novo_eixo.append(eixo[-1:])
+    for novo, v in zip(novos_valores, valores):
+        novo.append(v[-1:])
+    return (np.concatenate(novo_eixo),) + tuple(np.concatenate(novo) for novo in novos_valores)
+
+
+def reamostra_tempo(easting, northing, tempo, intervalo, fixos=None):
+    """
+    Reamostra o trajeto em instantes espaçados de 'intervalo' segundos,
+    interpolando linearmente a posição. Os pontos em 'fixos' são
+    mantidos. Retorna os vetores (easting, northing, tempo).
+    """
+    tempo = np.asarray(tempo, dtype=float)
+    novo_tempo, e, n = _reamostra(tempo, intervalo, fixos,
+                                  np.asarray(easting, dtype=float),
+                                  np.asarray(northing, dtype=float))
+    return e, n, novo_tempo
+
+
+def reamostra_distancia(easting, northing, tempo, passo, fixos=None):
+    """
+    Reamostra o trajeto em pontos espaçados de 'passo' metros ao longo
+    do caminho percorrido. Os pontos em 'fixos' são mantidos. Retorna
+    os vetores (easting, northing, tempo).
+
+    Como o veículo parado não percorre distância, os pontos de uma
+    parada colapsariam num só; use 'fixos' para preservar seus extremos.
+    """
+    easting = np.asarray(easting, dtype=float)
+    northing = np.asarray(northing, dtype=float)
+    ds = np.hypot(np.diff(easting), np.diff(northing))
+    distancia = np.concatenate(([0.0], np.cumsum(ds)))
+    _, e, n, t = _reamostra(distancia, passo, fixos, easting, northing,
+                            np.asarray(tempo, dtype=float))
+    return e, n, t
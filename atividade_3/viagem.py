@@ -0,0 +1,187 @@
+"""
+Viagem com colunas derivadas calculadas sob demanda.
+
+Colunas como `easting`, `northing`, `distancia_percorrida`,
+`tempo_decorrido` e velocidades eram calculadas de antemão (algumas até
+gravadas no JSON) e recalculadas a cada execução de exercicio_1. Aqui
+cada coluna derivada é declarada uma única vez, junto com as colunas das
+quais depende, e só é calculada quando acessada pela primeira vez:
+
+    viagem = Viagem.de_pontos(pontos)
+    viagem['distancia_percorrida']   # calcula easting/northing e a distância
+    viagem['distancia_percorrida']   # já está em memória
+
+Alterar uma coluna (viagem['lat'] = ...) descarta todas as colunas que
+dependem dela. Opcionalmente as colunas calculadas são gravadas num
+diretório, um arquivo .npy por coluna, com o nome identificado pelo hash
+das colunas de entrada e do código da função que calcula a coluna;
+execuções seguintes sobre os mesmos dados (e com a mesma função)
+carregam o arquivo em vez de recalcular.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+
+from distancias import distancia_acumulada
+from memoiza import digest_funcao
+from projecao import projeta
+
+COLUNAS_BASE = ('lat', 'lng', 'heading', 'shot_date')
+
+# nome da coluna -> (nomes das colunas produzidas, dependências, função)
+COLUNAS_DERIVADAS = {}
+
+
+def coluna_derivada(nomes, dependencias):
+    """
+    Decorador que registra uma função que calcula a(s) coluna(s) 'nomes'
+    a partir das colunas 'dependencias'. A função recebe os vetores das
+    dependências, na ordem dada, e retorna um vetor (ou uma tupla de
+    vetores, um para cada nome).
+    """
+    if isinstance(nomes, str):
+        nomes = (nomes,)
+
+    def registra(funcao):
+        for nome in nomes:
+            COLUNAS_DERIVADAS[nome] = (tuple(nomes), tuple(dependencias), funcao)
+        return funcao
+
+    return registra
+
+
+@coluna_derivada(('easting', 'northing'), ('lng', 'lat'))
+def _easting_northing(lng, lat):
+    return projeta(lng, lat)
+
+
+@coluna_derivada('tempo_decorrido', ('shot_date',))
+def _tempo_decorrido(shot_date):
+    return shot_date - shot_date[0]
+
+
+@coluna_derivada('distancia_percorrida', ('easting', 'northing'))
+def _distancia_percorrida(easting, northing):
+    return np.concatenate(([0.0], np.cumsum(np.hypot(np.diff(easting), np.diff(northing)))))
+
+
+@coluna_derivada('distancia_geodesica', ('lat', 'lng'))
+def _distancia_geodesica(lat, lng):
+    return distancia_acumulada(lat, lng, 'geodesica')
+
+
+def _velocidade(distancia, tempo):
+    # Velocidade média no passo que termina em cada ponto (zero no primeiro
+    # ponto e NaN quando duas fotos têm o mesmo instante).
+    dt = np.diff(tempo).astype(float)
+    ds = np.diff(distancia)
+    v = np.full(len(ds), np.nan)
+    np.divide(ds, dt, out=v, where=dt > 0)
+    return np.concatenate(([0.0], v))
+
+
+@coluna_derivada('velocidade', ('distancia_percorrida', 'tempo_decorrido'))
+def _velocidade_mercator(distancia, tempo):
+    return _velocidade(distancia, tempo)
+
+
+@coluna_derivada('velocidade_geodesica', ('distancia_geodesica', 'tempo_decorrido'))
+def _velocidade_geodesica(distancia, tempo):
+    return _velocidade(distancia, tempo)
+
+
+class Viagem:
+    """
+    Colunas de uma viagem. As colunas base (COLUNAS_BASE) são dadas na
+    criação; as derivadas (COLUNAS_DERIVADAS) são calculadas no primeiro
+    acesso. Se 'diretorio_cache' for dado, as colunas derivadas são
+    também gravadas/lidas nele.
+    """
+
+    def __init__(self, colunas, diretorio_cache=None):
+        self._colunas = {nome: np.asarray(valores) for nome, valores in colunas.items()}
+        self.diretorio_cache = diretorio_cache
+        if diretorio_cache is not None:
+            os.makedirs(diretorio_cache, exist_ok=True)
+
+    @classmethod
+    def de_pontos(cls, points_object, diretorio_cache=None):
+        """
+        Cria a viagem a partir da lista de pontos "points_object" com as
+        propriedades 'lat', 'lng', 'heading' e 'shot_date'. Os horários
+        são convertidos em segundos desde 1970-01-01.
+        """
+        colunas = {
+            'lat': np.array([float(p['lat']) for p in points_object]),
+            'lng': np.array([float(p['lng']) for p in points_object]),
+            'heading': np.array([float(p['heading']) for p in points_object]),
+            'shot_date': np.array([p['shot_date'] for p in points_object],
+                                  dtype='datetime64[s]').astype(np.int64),
+        }
+        return cls(colunas, diretorio_cache)
+
+    def __len__(self):
+        return len(self._colunas['lat'])
+
+    def __contains__(self, nome):
+        return nome in self._colunas or nome in COLUNAS_DERIVADAS
+
+    def colunas(self):
+        """Retorna os nomes de todas as colunas disponíveis."""
+        return list(self._colunas) + [n for n in COLUNAS_DERIVADAS if n not in self._colunas]
+
+    def calculadas(self):
+        """Retorna os nomes das colunas que já estão em memória."""
+        return list(self._colunas)
+
+    def __getitem__(self, nome):
+        if nome not in self._colunas:
+            if nome not in COLUNAS_DERIVADAS:
+                raise KeyError(nome)
+            self._calcula(nome)
+        return self._colunas[nome]
+
+    def __setitem__(self, nome, valores):
+        self._descarta_dependentes(nome)
+        self._colunas[nome] = np.asarray(valores)
+
+    def _descarta_dependentes(self, nome):
+        for derivada, (_, dependencias, _) in COLUNAS_DERIVADAS.items():
+            if nome in dependencias and derivada in self._colunas:
+                del self._colunas[derivada]
+                self._descarta_dependentes(derivada)
+
+    def _calcula(self, nome):
+        nomes, dependencias, funcao = COLUNAS_DERIVADAS[nome]
+        entradas = [self[d] for d in dependencias]
+
+        caminhos = None
+        if self.diretorio_cache is not None:
+            digest = hashlib.sha256(digest_funcao(funcao).encode())
+            for d, valores in zip(dependencias, entradas):
+                digest.update(d.encode())
+                digest.update(str(valores.dtype).encode())
+                digest.update(np.ascontiguousarray(valores).tobytes())
+            digest = digest.hexdigest()[:16]
+            caminhos = [os.path.join(self.diretorio_cache, f"{n}-{digest}.npy") for n in nomes]
+            if all(os.path.exists(c) for c in caminhos):
+                self._guarda(nomes, [np.load(c) for c in caminhos])
+                return
+
+        resultado = funcao(*entradas)
+        if len(nomes) == 1:
+            resultado = (resultado,)
+        resultado = [np.asarray(valores) for valores in resultado]
+        if caminhos is not None:
+            for c, valores in zip(caminhos, resultado):
+                np.save(c, valores)
+        self._guarda(nomes, resultado)
+
+    def _guarda(self, nomes, resultado):
+        # Colunas irmãs que já estão em memória (e.g. 'easting' dado pelo
+        # usuário ao pedir 'northing') não são sobrescritas.
+        for n, valores in zip(nomes, resultado):
+            if n not in self._colunas:
+                self._colunas[n] = valores
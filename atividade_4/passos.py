@@ -0,0 +1,128 @@
+"""
+Núcleos vetorizados para avançar populações inteiras de estados.
+
+nextXeuler, nextXa, nextXVeuler e nextXVa avançam uma única trajetória
+por chamada, e o custo de cada chamada em python é muito maior que o das
+poucas contas feitas nela. As funções abaixo avançam de uma só vez todos
+os estados de uma população (vetores numpy x e v) e escrevem o resultado
+no próprio vetor de entrada com os ufuncs do numpy (parâmetro out=). As
+funções que precisam de um vetor auxiliar recebem 'tmp': quem avança a
+população em laço cria um só (np.empty_like(v)) e o passa a cada passo,
+sem alocar vetores temporários do tamanho da população.
+
+O lado direito das EDOs é um polinômio em t dado pelos coeficientes
+'coefs' em ordem crescente (coefs[i] multiplica t^i). Como o tempo é o
+mesmo para toda a população, o polinômio é avaliado uma vez por passo
+(um escalar) e o custo por estado é de duas ou três operações.
+
+Para esses lados direitos também há o caminho exato (avanca_xv_exato e
+posicao_exata): a integral de um polinômio é outro polinômio, então o
+estado em qualquer instante é calculado em forma fechada, sem erro de
+discretização e sem precisar dos passos intermediários.
+
+Equivalências com as funções do exercício:
+
+- nextXeuler(x, t, [a, b], dt)  ->  avanca_x_euler(x, t, dt, [b, 2 * a])
+- nextXa(t, [a, b, x0])          ->  posicao_exata([b, 2 * a], x0, t)
+- nextXVeuler(x, t, v, dt)       ->  avanca_xv_euler(x, v, t, dt, [0, 6])
+- nextXVa(t)                     ->  posicao_exata([0, 6], 0, t, ordem=2)
+"""
+
+import time
+
+import numpy as np
+
+
+def _polinomio(coefs, t):
+    return float(np.polyval(np.asarray(coefs, dtype=float)[::-1], t))
+
+
+def primitiva(coefs):
+    """
+    Coeficientes (em ordem crescente) da primitiva do polinômio 'coefs'
+    que se anula em t = 0.
+    """
+    coefs = np.asarray(coefs, dtype=float)
+    return np.concatenate(([0.0], coefs / np.arange(1, len(coefs) + 1)))
+
+
+def avanca_x_euler(x, t, dt, coefs, out=None):
+    """
+    Um passo de Euler de dx/dt = p(t) para todos os estados do vetor
+    'x'. O resultado é escrito em 'out' (por padrão, no próprio 'x').
+    """
+    if out is None:
+        out = x
+    return np.add(x, _polinomio(coefs, t) * dt, out=out)
+
+
+def _soma_produto(x, v, escalar, tmp):
+    # x += v * escalar; com 'tmp' (do formato de v) não aloca nada.
+    tmp = np.multiply(v, escalar, out=tmp)
+    np.add(x, tmp, out=x)
+
+
+def avanca_xv_euler(x, v, t, dt, coefs, tmp=None):
+    """
+    Um passo de Euler de d2x/dt2 = p(t), no mesmo esquema de
+    nextXVeuler: primeiro v += p(t) dt e depois x += v dt (com o novo v).
+    'x' e 'v' são atualizados no lugar e também retornados. 'tmp' é um
+    vetor auxiliar opcional do formato de 'v'.
+    """
+    np.add(v, _polinomio(coefs, t) * dt, out=v)
+    _soma_produto(x, v, dt, tmp)
+    return x, v
+
+
+def avanca_xv_exato(x, v, t, dt, coefs, tmp=None):
+    """
+    Avança de t até t + dt, em forma fechada, todos os estados de
+    d2x/dt2 = p(t). 'x' e 'v' são atualizados no lugar e retornados.
+    'tmp' é como em avanca_xv_euler.
+    """
+    p1 = primitiva(coefs)
+    p2 = primitiva(p1)
+    dv = _polinomio(p1, t + dt) - _polinomio(p1, t)
+    dx_extra = _polinomio(p2, t + dt) - _polinomio(p2, t) - _polinomio(p1, t) * dt
+    _soma_produto(x, v, dt, tmp)
+    np.add(x, dx_extra, out=x)
+    np.add(v, dv, out=v)
+    return x, v
+
+
+def posicao_exata(coefs, x0, t, v0=0.0, t0=0.0, ordem=1):
+    """
+    Posição em 't' da solução de d^ordem x/dt^ordem = p(t) (ordem 1 ou 2)
+    que parte de x0 (e v0, usado só se ordem = 2) em t0. 'x0', 'v0' e
+    't' podem ser vetores; para ordem = 2 retorna a tupla (x, v).
+    """
+    t = np.asarray(t, dtype=float)
+    p1 = primitiva(coefs)
+    x0 = np.asarray(x0, dtype=float)
+    if ordem == 1:
+        return x0 + np.polyval(p1[::-1], t) - _polinomio(p1, t0)
+    if ordem != 2:
+        raise ValueError(f"Ordem deve ser 1 ou 2, não {ordem!r}.")
+    p2 = primitiva(p1)
+    v0 = np.asarray(v0, dtype=float)
+    v = v0 + np.polyval(p1[::-1], t) - _polinomio(p1, t0)
+    x = (x0 + v0 * (t - t0) + np.polyval(p2[::-1], t) - _polinomio(p2, t0)
+         - _polinomio(p1, t0) * (t - t0))
+    return x, v
+
+
+if __name__ == "__main__":
+    # Avança um milhão de trajetórias de d2x/dt2 = 6t de 0 a 1 s com dt = 0.1.
+    n = 1_000_000
+    x = np.zeros(n)
+    v = np.zeros(n)
+    tmp = np.empty_like(v)
+    t, dt = 0.0, 0.1
+    inicio = time.time()
+    for _ in range(10):
+        avanca_xv_euler(x, v, t, dt, [0, 6], tmp)
+        t += dt
+    duracao = time.time() - inicio
+    print(f"{n} trajetórias, 10 passos: {duracao * 100:.1f} ms por passo")
+    xa, va = posicao_exata([0, 6], 0, t, ordem=2)
+    print(f"Erro do método de Euler em t = {t:.1f}: {abs(x[0] - xa)}")
@@ -0,0 +1,145 @@
+"""
+Modelos físicos como sistemas de EDOs e integradores vetorizados.
+
+Um sistema é definido uma única vez como uma função f(t, estado, params)
+que retorna a derivada do estado. O estado é um vetor numpy cuja última
+dimensão é (x, v); as demais dimensões formam um lote de estados que é
+integrado de uma só vez. 'params' é um dicionário cujos valores podem
+ser números ou vetores com o formato do lote, de forma que cada estado
+do lote pode ter parâmetros diferentes (e.g. vários coeficientes de
+arrasto ao mesmo tempo).
+
+Sistemas e integradores ficam em registros (SISTEMAS e INTEGRADORES) e
+novos podem ser acrescentados com os decoradores registra_sistema e
+registra_integrador.
+"""
+
+import numpy as np
+
+G = 9.80665  # aceleração da gravidade padrão (m/s^2)
+
+SISTEMAS = {}
+INTEGRADORES = {}
+
+
+def registra_sistema(nome):
+    def registra(f):
+        SISTEMAS[nome] = f
+        return f
+    return registra
+
+
+def registra_integrador(nome):
+    def registra(passo):
+        INTEGRADORES[nome] = passo
+        return passo
+    return registra
+
+
+def _derivada(v, a):
+    return np.stack(np.broadcast_arrays(v, a), axis=-1)
+
+
+@registra_sistema('aceleracao_constante')
+def aceleracao_constante(t, estado, params):
+    """x'' = a"""
+    return _derivada(estado[..., 1], params['a'])
+
+
+@registra_sistema('queda_livre')
+def queda_livre(t, estado, params):
+    """x'' = -g (x para cima)"""
+    return _derivada(estado[..., 1], -params.get('g', G))
+
+
+@registra_sistema('queda_livre_arrasto_linear')
+def queda_livre_arrasto_linear(t, estado, params):
+    """x'' = -g - k v, com k = b/m"""
+    v = estado[..., 1]
+    return _derivada(v, -params.get('g', G) - params['k'] * v)
+
+
+@registra_sistema('queda_livre_arrasto_quadratico')
+def queda_livre_arrasto_quadratico(t, estado, params):
+    """x'' = -g - k v |v|, com k = c/m"""
+    v = estado[..., 1]
+    return _derivada(v, -params.get('g', G) - params['k'] * v * np.abs(v))
+
+
+@registra_integrador('euler')
+def passo_euler(f, t, estado, dt, params):
+    return estado + dt * f(t, estado, params)
+
+
+@registra_integrador('euler_cromer')
+def passo_euler_cromer(f, t, estado, dt, params):
+    # Atualiza primeiro a velocidade e usa a nova velocidade na posição.
+    v = estado[..., 1] + dt * f(t, estado, params)[..., 1]
+    x = estado[..., 0] + dt * v
+    return np.stack((x, v), axis=-1)
+
+
+@registra_integrador('rk4')
+def passo_rk4(f, t, estado, dt, params):
+    k1 = f(t, estado, params)
+    k2 = f(t + dt / 2, estado + dt / 2 * k1, params)
+    k3 = f(t + dt / 2, estado + dt / 2 * k2, params)
+    k4 = f(t + dt, estado + dt * k3, params)
+    return estado + dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+
+
+def resolve(sistema, estado0, tempos, params=None, integrador='rk4'):
+    """
+    Integra o 'sistema' (nome em SISTEMAS ou função f(t, estado, params))
+    a partir de 'estado0' (formato (..., 2)) nos instantes do vetor
+    'tempos', com o 'integrador' (nome em INTEGRADORES ou função).
+
+    Retorna um vetor com formato (len(tempos), ..., 2) com os estados
+    em cada instante; o primeiro é 'estado0'.
+    """
+    f = SISTEMAS[sistema] if isinstance(sistema, str) else sistema
+    passo = INTEGRADORES[integrador] if isinstance(integrador, str) else integrador
+    params = {} if params is None else params
+    tempos = np.asarray(tempos, dtype=float)
+    estado = np.asarray(estado0, dtype=float)
+
+    estados = np.empty((len(tempos),) + estado.shape)
+    estados[0] = estado
+    for i in range(1, len(tempos)):
+        estado = passo(f, tempos[i - 1], estado, tempos[i] - tempos[i - 1], params)
+        estados[i] = estado
+    return estados
+
+
+def forca_g(sistema, tempos, estados, params):
+    """
+    Aceleração própria (a medida por um acelerômetro), em unidades de g,
+    ao longo dos 'estados' retornados por resolve. Em queda livre sem
+    arrasto ela é nula.
+    """
+    f = SISTEMAS[sistema] if isinstance(sistema, str) else sistema
+    g = params.get('g', G)
+    tempos = np.asarray(tempos, dtype=float).reshape((-1,) + (1,) * (estados.ndim - 2))
+    a = f(tempos, estados, params)[..., 1]
+    return np.abs(a + g) / g
+
+
+def ajusta_parametro(sistema, tempos, observado, nome, candidatos, estado0=(0.0, 0.0),
+                     params=None, integrador='rk4', observavel=forca_g):
+    """
+    Ajusta o parâmetro 'nome' do 'sistema' ao vetor 'observado' (medido
+    nos instantes 'tempos') por busca na grade 'candidatos'.
+
+    Todos os candidatos são integrados num único lote e comparados pela
+    soma dos quadrados dos erros de observavel(sistema, tempos, estados,
+    params). Retorna (melhor valor, vetor de erros de cada candidato).
+    """
+    candidatos = np.asarray(candidatos, dtype=float)
+    params = dict({} if params is None else params)
+    params[nome] = candidatos
+    estado0 = np.broadcast_to(np.asarray(estado0, dtype=float), candidatos.shape + (2,))
+
+    estados = resolve(sistema, estado0, tempos, params, integrador)
+    previsto = observavel(sistema, tempos, estados, params)
+    erros = np.sum((previsto - np.asarray(observado, dtype=float)[:, None]) ** 2, axis=0)
+    return candidatos[np.argmin(erros)], erros
@@ -2,11 +2,49 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 
+from edo import ajusta_parametro
+
+URL_DADOS = "https://www.ime.usp.br/~cesar/courses/mac0209/quedaLivreData.csv"
+
+# Parado, o acelerômetro mede ~1 g; logo após ser solto, ~0 g.
+LIMIAR_SOLTURA = 0.5
+
+
+def carrega_acelerometro(arquivo=URL_DADOS):
+    return np.array(pd.read_csv(arquivo))
 
-def dados_acelerometro():
-    acelerometro = pd.read_csv("https://www.ime.usp.br/~cesar/courses/mac0209/quedaLivreData.csv")
 
-    acelerometro = np.array(acelerometro)
+def detecta_soltura(acelerometro, inicio=0, limiar=LIMIAR_SOLTURA):
+    """
+    Retorna a primeira linha, a partir de 'inicio', em que a resultante
+    medida pelo acelerômetro (em g) fica abaixo de 'limiar', isto é, o
+    instante em que o objeto é solto e começa a cair.
+    """
+    abaixo = np.flatnonzero(acelerometro[inicio:, 4] < limiar)
+    if len(abaixo) == 0:
+        raise ValueError(f"Nenhuma queda (resultante < {limiar} g) a partir da linha {inicio}.")
+    return inicio + int(abaixo[0])
+
+
+def ajusta_arrasto(acelerometro, t0, tf, sistema='queda_livre_arrasto_quadratico',
+                   candidatos=None):
+    """
+    Ajusta o coeficiente de arrasto 'k' do 'sistema' (ver edo.SISTEMAS)
+    à resultante medida pelo acelerômetro (em g) entre as linhas t0 e
+    tf, assumindo que o objeto parte do repouso em t0 (use
+    detecta_soltura para encontrar essa linha). Por padrão 'k' é
+    procurado entre 0 e 1, em passos de 0.001.
+    """
+    if candidatos is None:
+        candidatos = np.linspace(0, 1, 1001)
+    tempos = acelerometro[t0:tf, 0] - acelerometro[t0, 0]
+    resultante = acelerometro[t0:tf, 4]
+    k, erros = ajusta_parametro(sistema, tempos, resultante, 'k', candidatos)
+    return k, erros
+
+
+def dados_acelerometro():
+    acelerometro = carrega_acelerometro()
 
     x = acelerometro[:, 0]
     y = acelerometro[:, 4]
@@ -51,4 +89,11 @@ def dados_acelerometro():
 
 
 if __name__ == '__main__':
-    dados_acelerometro()
\ No newline at end of file
+    dados_acelerometro()
+
+    acelerometro = carrega_acelerometro()
+    # A queda está entre as linhas 500 e 800 (ver o zoom acima).
+    t0 = detecta_soltura(acelerometro, 500)
+    k, _ = ajusta_arrasto(acelerometro, t0, 800)
+    print(f'objeto solto na linha {t0} (t = {acelerometro[t0, 0]} s)')
+    print(f'coeficiente de arrasto ajustado: k = {k}')
\ No newline at end of file
@@ -0,0 +1,5 @@
+"""
+Linha de comando para as etapas de análise dos trajetos do KartaView.
+
+Uso: python -m mac0209 <etapa> [opções]   (veja python -m mac0209 --help)
+"""
@@ -0,0 +1,3 @@
+from mac0209.cli import main
+
+main()
@@ -0,0 +1,194 @@
+"""
+Linha de comando com as etapas de análise como subcomandos:
+
+    extract  extrai o campo 'photos' da resposta do KartaView
+    clean    mantém só os campos de interesse, ordenados e sem duplicatas
+    project  acrescenta `easting` e `northing` (EPSG:3857)
+    metrics  acrescenta `distancia_percorrida` e `tempo_decorrido`
+    segment  detecta os trechos em movimento e ajusta o modelo uniforme
+    plot     gráfico da distância percorrida em função do tempo
+
+Os módulos de cada atividade (photos_extract, projecao, viagem, ...)
+continuam nas pastas atividade_N, onde os scripts dos exercícios os
+importam diretamente; aqui eles só são importados quando o subcomando
+que precisa deles é executado. Assim `python -m mac0209 --help` ou
+`extract` não carregam numpy, pyproj ou matplotlib.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _usa_atividade(nome):
+    # Torna importáveis os módulos da pasta 'nome' (e.g. 'atividade_3').
+    caminho = os.path.join(RAIZ, nome)
+    if caminho not in sys.path:
+        sys.path.insert(0, caminho)
+
+
+def _escreve_json(arquivo, objeto):
+    with open(arquivo, "w") as f:
+        f.write(json.dumps(objeto))
+
+
+def _saida(args, prefixo):
+    if args.saida:
+        return args.saida
+    diretorio, nome = os.path.split(args.arquivo)
+    return os.path.join(diretorio, prefixo + nome)
+
+
+def extract(args):
+    _usa_atividade('atividade_2')
+    from photos_extract import make_extract_photos_JSON
+
+    with open(args.arquivo, "r") as jf:
+        make_extract_photos_JSON(_saida(args, "extracted_"), jf.read())
+
+
+def clean(args):
+    _usa_atividade('atividade_2')
+    from photos_extract import clean_extracted
+
+    with open(args.arquivo, "r") as jf:
+        clean = clean_extracted(jf.read())
+    avisos = clean['avisos']
+    if avisos['fora_de_ordem'] or avisos['saltos']:
+        print(f"{len(avisos['fora_de_ordem'])} fotos fora de ordem, "
+              f"{len(avisos['saltos'])} saltos de GPS", file=sys.stderr)
+    _escreve_json(_saida(args, "cleaned_"), clean)
+
+
+def project(args):
+    _usa_atividade('atividade_3')
+    from mac0209_ex3 import carrega_pontos
+    from projecao import projeta_paralelo
+
+    pontos = carrega_pontos(args.arquivo)
+    lng = [float(p['lng']) for p in pontos]
+    lat = [float(p['lat']) for p in pontos]
+    easting, northing = projeta_paralelo(lng, lat, processos=args.processos)
+    for p, e, n in zip(pontos, easting.tolist(), northing.tolist()):
+        p['easting'] = e
+        p['northing'] = n
+    _escreve_json(_saida(args, "projected_"), pontos)
+
+
+def metrics(args):
+    _usa_atividade('atividade_3')
+    from distancias import distancia_acumulada
+    from estatisticas import EstatisticasViagem
+    from mac0209_ex3 import carrega_pontos
+    from viagem import Viagem
+
+    pontos = carrega_pontos(args.arquivo)
+    viagem = Viagem.de_pontos(pontos, diretorio_cache=args.cache)
+    if all('easting' in p and 'northing' in p for p in pontos):
+        viagem['easting'] = [p['easting'] for p in pontos]
+        viagem['northing'] = [p['northing'] for p in pontos]
+    if args.metodo == 'mercator':
+        distancia = viagem['distancia_percorrida']
+    elif args.metodo == 'geodesica':
+        distancia = viagem['distancia_geodesica']
+    else:
+        distancia = distancia_acumulada(viagem['lat'], viagem['lng'], args.metodo)
+    tempo = viagem['tempo_decorrido']
+
+    for p, d, t in zip(pontos, distancia.tolist(), tempo.tolist()):
+        p['distancia_percorrida'] = d
+        p['tempo_decorrido'] = t
+    _escreve_json(_saida(args, "metrics_"), pontos)
+
+    estatisticas = EstatisticasViagem().atualiza(distancia, tempo).finaliza()
+    v = estatisticas.velocidade
+    print(f"distância: {distancia[-1]:.1f} m; tempo: {tempo[-1]} s; "
+          f"velocidade média: {estatisticas.velocidade_media:.2f} m/s")
+    print(f"velocidade por passo: média {v.media:.2f}, desvio {v.desvio_padrao:.2f}, "
+          f"mediana {estatisticas.quantis.quantil(0.5):.2f}, máx {v.maximo:.2f} (m/s)")
+
+
+def segment(args):
+    _usa_atividade('atividade_3')
+    from mac0209_ex3 import carrega_pontos
+    from modelos import ajusta_trechos
+    from simplificacao import detecta_trechos, get_trajeto_arrays
+
+    pontos = carrega_pontos(args.arquivo)
+    easting, northing, tempo = get_trajeto_arrays(pontos)
+    distancia = [p['distancia_percorrida'] for p in pontos]
+    trechos = detecta_trechos(easting, northing, tempo, args.vel_min, args.lacuna_max, args.min_pontos)
+    if not trechos:
+        print("nenhum trecho em movimento encontrado")
+        return
+    ajuste = ajusta_trechos(tempo, distancia, trechos, grau=args.grau)
+    for i, (inicio, fim) in enumerate(ajuste['trechos']):
+        linha = f"trecho {i + 1} ({inicio} a {fim}): v = {ajuste['v'][i]:.2f} m/s"
+        if args.grau == 2:
+            linha += f"; a = {ajuste['a'][i]:.4f} m/s^2"
+        print(f"{linha}; rmse = {ajuste['rmse'][i]:.1f} m")
+
+
+def plot(args):
+    _usa_atividade('atividade_3')
+    import matplotlib
+
+    if args.saida:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from mac0209_ex3 import carrega_pontos, plot_dist_time
+
+    pontos = carrega_pontos(args.arquivo)
+    plot_dist_time([p['distancia_percorrida'] for p in pontos],
+                   [p['tempo_decorrido'] for p in pontos], marker='.')
+    if args.saida:
+        plt.savefig(args.saida)
+    else:
+        plt.show()
+
+
+def cria_parser():
+    parser = argparse.ArgumentParser(
+        prog="mac0209",
+        description="Etapas de análise dos trajetos do KartaView.")
+    subparsers = parser.add_subparsers(dest='etapa', required=True)
+
+    def etapa(nome, funcao, ajuda, prefixo=None):
+        sub = subparsers.add_parser(nome, help=ajuda, description=ajuda)
+        sub.add_argument('arquivo', type=str, help="O arquivo JSON de entrada.")
+        if prefixo is not None:
+            sub.add_argument('-o', '--saida', type=str, default=None,
+                             help=f"Arquivo de saída (padrão: {prefixo}<arquivo>).")
+        sub.set_defaults(funcao=funcao)
+        return sub
+
+    etapa('extract', extract, "Extraí o campo 'photos' da resposta JSON do KartaView.", "extracted_")
+    etapa('clean', clean, "Mantém só 'lat', 'lng', 'heading' e 'shot_date' de cada foto.", "cleaned_")
+    sub = etapa('project', project, "Acrescenta 'easting' e 'northing' (EPSG:3857) aos pontos.", "projected_")
+    sub.add_argument('--processos', type=int, default=1,
+                     help="Número de processos da reprojeção (padrão: 1).")
+    sub = etapa('metrics', metrics, "Acrescenta 'distancia_percorrida' e 'tempo_decorrido' aos pontos.",
+                "metrics_")
+    sub.add_argument('--metodo', choices=('mercator', 'haversine', 'geodesica', 'utm'), default='mercator',
+                     help="Distância euclidiana em EPSG:3857 ou um dos métodos de "
+                          "distancias.METODOS (padrão: mercator).")
+    sub.add_argument('--cache', type=str, default=None,
+                     help="Diretório para guardar as colunas calculadas.")
+    sub = etapa('segment', segment, "Detecta os trechos em movimento e ajusta um modelo a cada um.")
+    sub.add_argument('--vel-min', type=float, default=0.5, help="Velocidade mínima em movimento (m/s).")
+    sub.add_argument('--lacuna-max', type=float, default=60, help="Maior intervalo entre fotos (s).")
+    sub.add_argument('--min-pontos', type=int, default=50, help="Menor número de pontos de um trecho.")
+    sub.add_argument('--grau', type=int, choices=(1, 2), default=1,
+                     help="1: movimento uniforme; 2: uniformemente acelerado.")
+    sub = etapa('plot', plot, "Gráfico da distância percorrida em função do tempo.")
+    sub.add_argument('-o', '--saida', type=str, default=None,
+                     help="Salva o gráfico neste arquivo em vez de mostrá-lo.")
+    return parser
+
+
+def main(argv=None):
+    args = cria_parser().parse_args(argv)
+    args.funcao(args)